@@ -10,10 +10,22 @@ from pathlib import Path
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
 from .client import PrizrakClient
-from .const import DOMAIN, CONF_EMAIL, CONF_PASSWORD
+from .const import (
+    CONF_EMAIL,
+    CONF_PASSWORD,
+    CONF_STATISTICS_MODE,
+    CONF_TRIP_IDLE_TIMEOUT,
+    CONF_USE_MESSAGEPACK,
+    DEFAULT_TRIP_IDLE_TIMEOUT,
+    DOMAIN,
+)
 from .coordinator import PrizrakDataUpdateCoordinator
+from .hub import ConnectionHub
+from .services import async_register_services, async_unregister_services
+from .storage import PrizrakDeviceCache, async_get_auth_cache
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -86,23 +98,47 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     # Create coordinator
     coordinator = PrizrakDataUpdateCoordinator(hass, None)
+    coordinator.trip_idle_timeout = (
+        entry.options.get(CONF_TRIP_IDLE_TIMEOUT, DEFAULT_TRIP_IDLE_TIMEOUT) * 60
+    )
+    coordinator.statistics_mode = entry.options.get(CONF_STATISTICS_MODE, False)
 
     # Create client with coordinator callback that schedules updates in HA event loop
-    def state_update_callback(device_id: int, state: dict) -> None:
+    def state_update_callback(device_id: int, state: dict, changed: set) -> None:
         """Schedule state update in HA event loop."""
         hass.loop.call_soon_threadsafe(
-            coordinator.handle_device_update, device_id, state
+            coordinator.handle_device_update, device_id, state, changed
         )
 
+    def devices_update_callback(devices: list) -> None:
+        """Schedule device catalog handling in HA event loop."""
+        hass.loop.call_soon_threadsafe(coordinator.handle_devices_update, devices)
+
+    # Cached app version and token let a restart skip the scrape and login
+    auth_cache = await async_get_auth_cache(hass)
+
     client = PrizrakClient(
         email,
         password,
-        state_update_callback
+        state_update_callback,
+        hub=_get_hub(hass),
+        use_messagepack=entry.options.get(CONF_USE_MESSAGEPACK, False),
+        auth_cache=await auth_cache.async_get(email),
+        auth_cache_callback=lambda cache: auth_cache.async_set(email, cache),
+        devices_callback=devices_update_callback
     )
 
     # Store client in coordinator
     coordinator.client = client
 
+    # Warm start from the last saved device catalog and states
+    device_cache = PrizrakDeviceCache(hass, entry.entry_id)
+    coordinator.device_cache = device_cache
+    coordinator.reload_callback = lambda: hass.config_entries.async_schedule_reload(entry.entry_id)
+    snapshot = await device_cache.async_load()
+    if snapshot:
+        coordinator.restore_snapshot(*snapshot)
+
     # Store coordinator
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = coordinator
@@ -121,45 +157,66 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Store task for cleanup
     hass.data[DOMAIN][f"{entry.entry_id}_task"] = task
 
-    # Wait for devices to be ready (with timeout)
-    try:
-        _LOGGER.info("Waiting for devices to be ready...")
-        await asyncio.wait_for(client.devices_ready.wait(), timeout=90.0)
-        _LOGGER.info("Devices are ready, setting up platforms")
-    except asyncio.TimeoutError:
-        _LOGGER.error("Timeout waiting for devices, setting up platforms anyway")
+    # Without a snapshot, wait for devices to be ready (with timeout)
+    if not snapshot:
+        try:
+            _LOGGER.info("Waiting for devices to be ready...")
+            await asyncio.wait_for(client.devices_ready.wait(), timeout=90.0)
+            _LOGGER.info("Devices are ready, setting up platforms")
+        except asyncio.TimeoutError:
+            _LOGGER.error("Timeout waiting for devices, setting up platforms anyway")
 
     # Setup platforms
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    # Register reconnect service
-    async def handle_reconnect(call):
-        """Handle reconnect service call."""
-        _LOGGER.info("Reconnect service called - forcing reconnection...")
-        coordinator: PrizrakDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    # Services are shared by all entries
+    async_register_services(hass)
 
-        # Close current WebSocket connection to trigger reconnect
-        if coordinator.client.websocket:
-            try:
-                await coordinator.client.websocket.close()
-                _LOGGER.info("WebSocket closed, will reconnect automatically")
-            except Exception as e:
-                _LOGGER.error(f"Error closing WebSocket: {e}")
+    if coordinator.statistics_mode:
+        coordinator.async_start_statistics()
 
-        # Reset connection_id to force new negotiation
-        coordinator.client.connection_id = None
-        _LOGGER.info("Connection ID reset for clean reconnection")
-
-    hass.services.async_register(DOMAIN, "reconnect", handle_reconnect)
+    # Reload the entry when options change so the client picks them up
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
 
     return True
 
 
+def _get_hub(hass: HomeAssistant) -> ConnectionHub:
+    """Return the connection hub shared by all accounts."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    hub = domain_data.get("hub")
+    if hub is None:
+        hub = domain_data["hub"] = ConnectionHub(async_get_clientsession(hass))
+    return hub
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Drop persisted data when a config entry is removed."""
+    auth_cache = await async_get_auth_cache(hass)
+    await auth_cache.async_remove(entry.data[CONF_EMAIL])
+    await PrizrakDeviceCache(hass, entry.entry_id).async_remove()
+
+
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry after its options were changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     # Stop the client
     coordinator: PrizrakDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
     coordinator.client.stop()
+    coordinator.async_cancel_pending_updates()
+    coordinator.commands.cancel()
+
+    # Import the hours closed since the last tick (the open hour is lost)
+    if coordinator.statistics_mode:
+        coordinator.async_flush_statistics()
+
+    # Persist the latest snapshot for the next warm start
+    if coordinator.device_cache:
+        await coordinator.device_cache.async_flush()
 
     # Cancel the background task
     task = hass.data[DOMAIN].get(f"{entry.entry_id}_task")
@@ -177,7 +234,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         hass.data[DOMAIN].pop(entry.entry_id)
         hass.data[DOMAIN].pop(f"{entry.entry_id}_task", None)
 
-        # Unregister service
-        hass.services.async_remove(DOMAIN, "reconnect")
+        # Unregister services after the last entry
+        async_unregister_services(hass)
 
     return unload_ok
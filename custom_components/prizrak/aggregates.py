@@ -0,0 +1,171 @@
+"""In-memory mean/min/max aggregation of sensor values."""
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+# (period start in epoch seconds, mean, min, max)
+Aggregate = Tuple[float, float, float, float]
+
+
+class Bucket:
+    """Time-weighted mean, min and max of a value over one period."""
+
+    __slots__ = ("start", "end", "integral", "covered", "min", "max")
+
+    def __init__(self, start: float, period: float):
+        """Initialize an empty bucket for [start, start + period)."""
+        self.start = start
+        self.end = start + period
+        self.integral = 0.0
+        self.covered = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def include(self, value: float):
+        """Account a value seen in the period for min/max."""
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def credit(self, value: float, seconds: float):
+        """Account a value held for seconds for the mean."""
+        self.integral += value * seconds
+        self.covered += seconds
+
+    def fold(self, other: "Bucket"):
+        """Add a shorter bucket within this period."""
+        self.integral += other.integral
+        self.covered += other.covered
+        if other.min is not None:
+            self.include(other.min)
+            self.include(other.max)
+
+    def summary(self) -> Optional[Aggregate]:
+        """Return (start, mean, min, max), or None if nothing was seen."""
+        if self.min is None:
+            return None
+        mean = self.integral / self.covered if self.covered else self.min
+        return self.start, mean, self.min, self.max
+
+
+class SeriesAggregator:
+    """Mean/min/max of one sensor per short period and per hour.
+
+    A value counts for the mean for as long as it is held, so a sensor
+    that only reports changes is not skewed towards busy periods. The
+    value is held while the device is heard from (add() or touch()); after
+    max_hold without either it is dropped (no made-up hours for an offline
+    car), and the open buckets are closed once their period ends, so a
+    value arriving later in the same period continues them. Short buckets
+    are folded into the hour; the last short_history of them stay
+    available, closed hours wait in a bounded queue until they are taken
+    with pop_closed(). Memory is constant per series.
+    """
+
+    __slots__ = (
+        "short_period", "long_period", "max_hold", "history", "closed",
+        "_value", "_seen", "_time", "_short", "_long",
+    )
+
+    def __init__(
+        self,
+        short_period: float = 300.0,
+        long_period: float = 3600.0,
+        short_history: int = 12,
+        max_closed: int = 72,
+        max_hold: float = 21600.0,
+    ):
+        """Initialize the aggregator.
+
+        Args:
+            short_period: Seconds per short bucket (must divide long_period)
+            long_period: Seconds per long bucket
+            short_history: Closed short buckets kept
+            max_closed: Closed long buckets kept until taken (oldest dropped)
+            max_hold: Seconds a value is held without hearing from the device
+        """
+        self.short_period = short_period
+        self.long_period = long_period
+        self.max_hold = max_hold
+        self.history: Deque[Aggregate] = deque(maxlen=short_history)
+        self.closed: Deque[Aggregate] = deque(maxlen=max_closed)
+        self._value: Optional[float] = None
+        self._seen = 0.0
+        self._time = 0.0
+        self._short: Optional[Bucket] = None
+        self._long: Optional[Bucket] = None
+
+    def add(self, timestamp: float, value: float):
+        """Record a new value at timestamp (epoch seconds)."""
+        self.advance(timestamp)
+        if self._long is None:
+            self._long = Bucket(timestamp - timestamp % self.long_period, self.long_period)
+        if self._short is None:
+            self._short = Bucket(timestamp - timestamp % self.short_period, self.short_period)
+        self._short.include(value)
+        self._value = value
+        self._time = max(self._time, timestamp)
+        self.touch(timestamp)
+
+    def touch(self, timestamp: float):
+        """Note that the device was heard from, unchanged values included."""
+        if timestamp > self._seen:
+            self._seen = timestamp
+
+    def advance(self, timestamp: float):
+        """Credit the held value up to timestamp, closing finished buckets."""
+        if self._value is not None:
+            expires = self._seen + self.max_hold
+            if timestamp <= expires:
+                self._credit(timestamp)
+                return
+            self._credit(expires)
+            self._value = None
+        # Nothing held: close the buckets whose period is over
+        short = self._short
+        if short is not None and timestamp >= short.end:
+            self._finish_short()
+            self._short = None
+        if self._long is not None and timestamp >= self._long.end:
+            self._finish_long()
+            self._long = None
+
+    def pop_closed(self) -> List[Aggregate]:
+        """Return and forget the closed long buckets."""
+        closed = list(self.closed)
+        self.closed.clear()
+        return closed
+
+    def _credit(self, timestamp: float):
+        """Credit the held value from the last credit up to timestamp."""
+        if timestamp <= self._time:
+            return
+        value = self._value
+        time = self._time
+        short = self._short
+        while timestamp >= short.end:
+            short.credit(value, short.end - time)
+            time = short.end
+            self._finish_short()
+            if short.end >= self._long.end:
+                self._finish_long()
+                self._long = Bucket(self._long.end, self.long_period)
+            short = self._short = Bucket(short.end, self.short_period)
+            # The held value carries into the next period
+            short.include(value)
+        short.credit(value, timestamp - time)
+        self._time = timestamp
+
+    def _finish_short(self):
+        """Record the short bucket and fold it into the hour."""
+        short = self._short
+        summary = short.summary()
+        if summary is not None:
+            self.history.append(summary)
+        self._long.fold(short)
+
+    def _finish_long(self):
+        """Queue the hour for pop_closed()."""
+        summary = self._long.summary()
+        if summary is not None:
+            self.closed.append(summary)
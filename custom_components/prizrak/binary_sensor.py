@@ -2,16 +2,19 @@
 from __future__ import annotations
 
 import logging
+import operator
+from collections.abc import Callable
+from functools import partial
 from typing import Any
 
 from homeassistant.components.binary_sensor import BinarySensorDeviceClass, BinarySensorEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN, BINARY_SENSOR_TYPES
+from .const import DOMAIN, BINARY_SENSOR_TYPES, ON_UNLESS_IN, ON_WHEN_EQUALS
 from .coordinator import PrizrakDataUpdateCoordinator
+from .entity import PrizrakEntity, compile_state_accessor
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,7 +35,7 @@ async def async_setup_entry(
         device_name = device_info.get('name', f"Prizrak {device_id}") if device_info else f"Prizrak {device_id}"
         device_model = device_info.get('model', 'Unknown') if device_info else 'Unknown'
 
-        for sensor_key, (name, device_class, state_key) in BINARY_SENSOR_TYPES.items():
+        for sensor_key, (name, device_class, state_key, on_when) in BINARY_SENSOR_TYPES.items():
             entities.append(
                 PrizrakBinarySensor(
                     coordinator,
@@ -42,14 +45,26 @@ async def async_setup_entry(
                     sensor_key,
                     name,
                     device_class,
-                    state_key
+                    state_key,
+                    on_when
                 )
             )
 
     async_add_entities(entities)
 
 
-class PrizrakBinarySensor(CoordinatorEntity, BinarySensorEntity):
+def compile_predicate(on_when: tuple[str, Any]) -> Callable[[Any], bool]:
+    """Turn an on_when spec from BINARY_SENSOR_TYPES into a predicate."""
+    kind, operand = on_when
+    if kind == ON_WHEN_EQUALS:
+        return partial(operator.eq, operand)
+    if kind == ON_UNLESS_IN:
+        off_states = frozenset(operand)
+        return lambda value: value not in off_states
+    raise ValueError(f"Unknown binary sensor predicate: {kind}")
+
+
+class PrizrakBinarySensor(PrizrakEntity, BinarySensorEntity):
     """Representation of a Prizrak binary sensor."""
 
     def __init__(
@@ -62,6 +77,7 @@ class PrizrakBinarySensor(CoordinatorEntity, BinarySensorEntity):
         name: str,
         device_class: str,
         state_key: str,
+        on_when: tuple[str, Any],
     ) -> None:
         """Initialize the binary sensor."""
         super().__init__(coordinator)
@@ -69,6 +85,10 @@ class PrizrakBinarySensor(CoordinatorEntity, BinarySensorEntity):
         self._device_name = device_name
         self._sensor_key = sensor_key
         self._state_key = state_key
+        # Memoized per device version: the raw value and its on/off reading
+        read_value = compile_state_accessor(state_key)
+        is_on = compile_predicate(on_when)
+        self._state_accessor = lambda state: is_on(read_value(state))
 
         # Entity name and ID
         self._attr_name = name  # Friendly name shown in UI
@@ -85,53 +105,15 @@ class PrizrakBinarySensor(CoordinatorEntity, BinarySensorEntity):
             "suggested_area": "Garage",
         }
 
+    @property
+    def state_keys(self) -> tuple[str, ...]:
+        """Return the state keys this binary sensor reads."""
+        return (self._state_key,)
+
     @property
     def is_on(self) -> bool:
         """Return true if the binary sensor is on."""
-        device_state = self.coordinator.devices.get(self._device_id, {})
-
-        # Handle nested keys (e.g., "geo.gps_state")
-        if '.' in self._state_key:
-            keys = self._state_key.split('.')
-            value = device_state
-            for key in keys:
-                if isinstance(value, dict):
-                    value = value.get(key)
-                else:
-                    value = None
-                    break
-        else:
-            value = device_state.get(self._state_key)
-
-        # Doors/locks: "Open" = ON (open)
-        if value == "Open":
-            return True
-
-        # Connection: Connected = ON, Disconnected = OFF
-        if self._state_key == "connection_state":
-            return value == "Connected"
-
-        # Guard: any state except SafeGuardOff = ON
-        if self._state_key == "guard":
-            return value not in ["SafeGuardOff", "Unknown", None, ""]
-
-        # Alarm: anything except "Off" = ON
-        if self._state_key == "alarm":
-            return value not in ["Off", "Unknown", None, ""]
-
-        # GPS: "Actual" = ON
-        if self._state_key == "geo.gps_state":
-            return value == "Actual"
-
-        # Ignition: any state except engine off states = ON
-        if self._state_key == "ignition_switch":
-            return value not in ["EngineOffNoKey", "EngineOff", "Unknown", None, ""]
-
-        # Parking brake: "On" = problem (ON)
-        if self._state_key == "parking_brake":
-            return value == "On"
-
-        return False
+        return self._state_value()
 
     @property
     def available(self) -> bool:
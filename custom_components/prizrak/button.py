@@ -7,11 +7,12 @@ from homeassistant.components.button import ButtonEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.exceptions import HomeAssistantError
 
+from .commands import CommandSupersededError
 from .const import DOMAIN, BUTTON_TYPES
 from .coordinator import PrizrakDataUpdateCoordinator
+from .entity import PrizrakEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -49,7 +50,7 @@ async def async_setup_entry(
     async_add_entities(entities)
 
 
-class PrizrakButton(CoordinatorEntity, ButtonEntity):
+class PrizrakButton(PrizrakEntity, ButtonEntity):
     """Representation of a Prizrak button."""
 
     def __init__(
@@ -85,6 +86,11 @@ class PrizrakButton(CoordinatorEntity, ButtonEntity):
             "suggested_area": "Garage",
         }
 
+    @property
+    def state_keys(self) -> tuple[str, ...]:
+        """Buttons have no state; only availability changes matter."""
+        return ()
+
     async def async_press(self) -> None:
         """Handle the button press."""
         _LOGGER.info(f"Button pressed: {self._command} for device {self._device_id}")
@@ -97,12 +103,9 @@ class PrizrakButton(CoordinatorEntity, ButtonEntity):
                 f"Please check your internet connection and try again."
             )
 
-        # Disable throttling temporarily to show immediate feedback in browser
-        self.coordinator.disable_throttling_temporarily(duration=30.0)
-
-        # Send command via client with timeout
+        # Send command via the per-device queue (duplicates share one call)
         try:
-            success = await self.coordinator.client.send_command(
+            success = await self.coordinator.commands.submit(
                 self._device_id,
                 self._command,
                 timeout=10.0
@@ -117,6 +120,10 @@ class PrizrakButton(CoordinatorEntity, ButtonEntity):
                     f"Please check device status and try again."
                 )
 
+        except CommandSupersededError as e:
+            # A newer press replaced this one before it was sent
+            _LOGGER.info(f"Command {self._command} not sent for device {self._device_id}: {e}")
+
         except Exception as e:
             _LOGGER.error(f"Error executing command {self._command}: {e}")
             if isinstance(e, HomeAssistantError):
@@ -1,18 +1,318 @@
 """Prizrak monitoring client for Home Assistant."""
 import asyncio
+from collections import deque
+import aiohttp
 import websockets
 import json
-import requests
 import urllib.parse
 import logging
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, Iterator, Set, Tuple, Union
 import time
 import hashlib
 import base64
 import re
 
+try:
+    import msgpack
+except ImportError:  # MessagePack hub protocol is optional
+    msgpack = None
+
+MESSAGEPACK_AVAILABLE = msgpack is not None
+
+try:
+    import orjson
+except ImportError:  # Fast JSON codec is optional, stdlib json is the fallback
+    orjson = None
+
+from .hub import ConnectionHub
+from .reconnect import FAILURE_AUTH, FAILURE_NETWORK, FAILURE_SERVER, ReconnectScheduler
+from .rpc import ConnectionLostError, InvocationError, RpcMultiplexer
+from .state import DeviceRecord
+
 _LOGGER = logging.getLogger(__name__)
 
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=10)
+DELETE_TIMEOUT = aiohttp.ClientTimeout(total=5)
+
+# SignalR record separator terminating every JSON hub message
+RECORD_SEPARATOR = 0x1E
+
+# Stateful reconnect messages (SignalR hub protocol v1 extension)
+MSG_ACK = 8
+MSG_SEQUENCE = 9
+# Message types that carry a sequence id (invocation .. cancel invocation)
+SEQUENCED_MESSAGE_TYPES = frozenset((1, 2, 3, 4, 5))
+
+
+class SignalRRecordParser:
+    """Incremental parser for \\x1e-terminated SignalR records.
+
+    Frames are appended to a single reusable buffer. Complete records are
+    sliced out as they become available; a trailing partial record stays in
+    the buffer until the frame carrying its separator arrives.
+    """
+
+    def __init__(self):
+        """Initialize the parser."""
+        self._buffer = bytearray()
+        self._pos = 0
+
+    def feed(self, data: Union[bytes, str]):
+        """Append a WebSocket frame to the buffer."""
+        if self._pos:
+            # Drop records already handed out before growing the buffer
+            del self._buffer[:self._pos]
+            self._pos = 0
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._buffer += data
+
+    def next_record(self) -> Optional[bytearray]:
+        """Return the next complete record, or None if none is buffered."""
+        buffer = self._buffer
+        while True:
+            end = buffer.find(RECORD_SEPARATOR, self._pos)
+            if end < 0:
+                return None
+            start = self._pos
+            self._pos = end + 1
+            if end > start:
+                return buffer[start:end]
+
+    def __iter__(self) -> Iterator[bytearray]:
+        """Iterate over all complete records currently buffered."""
+        while (record := self.next_record()) is not None:
+            yield record
+
+    def reset(self):
+        """Discard any buffered data (used when a new connection starts)."""
+        self._buffer.clear()
+        self._pos = 0
+
+    def remaining(self) -> bytes:
+        """Return buffered bytes that have not been handed out as records."""
+        return bytes(self._buffer[self._pos:])
+
+
+class MessagePackRecordParser(SignalRRecordParser):
+    """Incremental parser for VarInt length-prefixed MessagePack records."""
+
+    def next_record(self) -> Optional[bytearray]:
+        """Return the next complete record, or None if none is buffered."""
+        buffer = self._buffer
+        pos = self._pos
+        length = 0
+        shift = 0
+        # Length prefix: up to 5 bytes, 7 bits each, low bits first
+        while True:
+            if pos >= len(buffer):
+                return None
+            byte = buffer[pos]
+            pos += 1
+            length |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                break
+            shift += 7
+            if shift > 28:
+                raise ValueError("Invalid MessagePack record length prefix")
+        end = pos + length
+        if end > len(buffer):
+            return None
+        self._pos = end
+        return buffer[pos:end]
+
+
+class MessageSequence:
+    """Sequence and ack bookkeeping for SignalR stateful reconnect.
+
+    Outgoing sequenced messages stay buffered until the server acks them so
+    they can be replayed after a resume. Incoming sequenced messages are
+    numbered so replays of already processed messages can be skipped.
+    """
+
+    def __init__(self, max_buffered: int = 100):
+        """Initialize the tracker."""
+        self.max_buffered = max_buffered
+        self.reset()
+
+    def reset(self):
+        """Start a fresh sequence (new connection token)."""
+        self.next_send_id = 1
+        self.unacked: deque = deque()
+        self.overflowed = False
+        self.next_receive_id = 1
+        self.last_received = 0
+        self.last_ack_sent = 0
+
+    def track_sent(self, frame: bytes):
+        """Buffer an encoded sequenced message until it is acked."""
+        self.unacked.append((self.next_send_id, frame))
+        self.next_send_id += 1
+        if len(self.unacked) > self.max_buffered:
+            # Too far behind to replay reliably, the next reconnect renegotiates
+            self.unacked.popleft()
+            self.overflowed = True
+
+    def ack(self, sequence_id: int):
+        """Drop buffered messages acknowledged by the server."""
+        while self.unacked and self.unacked[0][0] <= sequence_id:
+            self.unacked.popleft()
+
+    def receive(self) -> bool:
+        """Number an incoming sequenced message; False if already processed."""
+        sequence_id = self.next_receive_id
+        self.next_receive_id += 1
+        if sequence_id <= self.last_received:
+            return False
+        self.last_received = sequence_id
+        return True
+
+    def resend_from(self) -> int:
+        """Return the sequence id of the first message to replay."""
+        return self.unacked[0][0] if self.unacked else self.next_send_id
+
+
+class StdlibJsonCodec:
+    """JSON codec backed by the standard library."""
+
+    name = "json"
+
+    @staticmethod
+    def dumps(obj: Any) -> bytes:
+        """Serialize to UTF-8 encoded JSON."""
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    @staticmethod
+    def loads(data: Union[bytes, bytearray, str]) -> Any:
+        """Deserialize JSON from bytes or str."""
+        if not isinstance(data, str):
+            # Explicit decode is cheaper than json.loads' encoding detection
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """JSON codec backed by orjson (works on bytes directly)."""
+
+    name = "orjson"
+
+    @staticmethod
+    def dumps(obj: Any) -> bytes:
+        """Serialize to UTF-8 encoded JSON."""
+        return orjson.dumps(obj)
+
+    @staticmethod
+    def loads(data: Union[bytes, bytearray, str]) -> Any:
+        """Deserialize JSON from bytes or str."""
+        return orjson.loads(data)
+
+
+def get_json_codec():
+    """Return the fastest available JSON codec."""
+    return OrjsonCodec() if orjson is not None else StdlibJsonCodec()
+
+
+class JsonHubProtocol:
+    """SignalR JSON hub protocol (text frames, \\x1e separated)."""
+
+    name = "json"
+    transfer_format = "Text"
+    text_frames = True
+
+    def __init__(self, codec=None):
+        """Initialize the protocol and pre-encode constant frames."""
+        self.codec = codec or get_json_codec()
+        # Version 2 enables stateful reconnect (Ack/Sequence) on the server
+        self.handshake_frames = {
+            version: self.codec.dumps({"protocol": self.name, "version": version}) + b'\x1e'
+            for version in (1, 2)
+        }
+        self.ping_frame = self.encode({"type": 6})
+
+    def create_parser(self) -> SignalRRecordParser:
+        """Return a record parser for this protocol."""
+        return SignalRRecordParser()
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        """Encode a hub message as a JSON record."""
+        return self.codec.dumps(message) + b'\x1e'
+
+    def decode(self, record: bytearray) -> Dict[str, Any]:
+        """Decode a JSON record into a hub message."""
+        return self.codec.loads(record)
+
+
+class MessagePackHubProtocol:
+    """SignalR MessagePack hub protocol (binary frames, length prefixed).
+
+    Messages are converted to and from the same dict shape the JSON protocol
+    uses, so the dispatcher does not depend on the wire format.
+    """
+
+    name = "messagepack"
+    transfer_format = "Binary"
+    text_frames = False
+
+    def __init__(self):
+        """Initialize the protocol and pre-encode constant frames."""
+        # The handshake is JSON text even when it selects MessagePack
+        self.handshake_frames = {
+            version: StdlibJsonCodec.dumps({"protocol": self.name, "version": version}) + b'\x1e'
+            for version in (1, 2)
+        }
+        self.ping_frame = self.encode({"type": 6})
+
+    def create_parser(self) -> SignalRRecordParser:
+        """Return a record parser for this protocol."""
+        return MessagePackRecordParser()
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        """Encode a hub message as a length-prefixed MessagePack record."""
+        msg_type = message["type"]
+        if msg_type == 1:
+            # [1, Headers, InvocationId, Target, Arguments, StreamIds]
+            payload = [1, {}, message.get("invocationId"), message["target"], message.get("arguments", []), []]
+        elif msg_type in (MSG_ACK, MSG_SEQUENCE):
+            payload = [msg_type, message["sequenceId"]]
+        else:
+            payload = [msg_type]
+        body = msgpack.packb(payload, use_bin_type=True)
+
+        prefix = bytearray()
+        length = len(body)
+        while True:
+            byte = length & 0x7F
+            length >>= 7
+            if length:
+                prefix.append(byte | 0x80)
+            else:
+                prefix.append(byte)
+                break
+        return bytes(prefix) + body
+
+    def decode(self, record: bytearray) -> Dict[str, Any]:
+        """Decode a MessagePack record into a hub message."""
+        # timestamp=3: the MessagePack Timestamp extension (.NET DateTime)
+        # comes back as an aware datetime, like the parsed JSON strings
+        data = msgpack.unpackb(record, raw=False, strict_map_key=False, timestamp=3)
+        msg_type = data[0]
+        if msg_type == 1:
+            return {"type": 1, "invocationId": data[2], "target": data[3], "arguments": data[4]}
+        if msg_type == 3:
+            # ResultKind: 1 = error, 2 = void, 3 = result
+            message = {"type": 3, "invocationId": data[2]}
+            result_kind = data[3]
+            if result_kind == 1:
+                message["error"] = data[4]
+            elif result_kind == 3:
+                message["result"] = data[4]
+            return message
+        if msg_type == 7:
+            return {"type": 7, "error": data[1] if len(data) > 1 else None}
+        if msg_type in (MSG_ACK, MSG_SEQUENCE):
+            return {"type": msg_type, "sequenceId": data[1]}
+        return {"type": msg_type}
+
 
 class PrizrakClient:
     """Client for Prizrak monitoring system."""
@@ -21,18 +321,47 @@ class PrizrakClient:
         self,
         email: str,
         password: str,
-        state_callback: Callable[[int, Dict[str, Any]], None]
+        state_callback: Callable[[int, Dict[str, Any], Set[str]], None],
+        session: Optional[aiohttp.ClientSession] = None,
+        use_messagepack: bool = False,
+        auth_cache: Optional[Dict[str, Any]] = None,
+        auth_cache_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        devices_callback: Optional[Callable[[list], None]] = None,
+        hub: Optional[ConnectionHub] = None
     ):
         """Initialize the client.
 
         Args:
             email: User email for authentication
             password: User password
-            state_callback: Callback function for device state updates
+            state_callback: Called with (device_id, partial state, changed
+                paths) for every EventObject that changed something
+            session: Shared aiohttp session (e.g. HA's client session).
+                If omitted, the client creates and owns its own session.
+            use_messagepack: Prefer the binary MessagePack hub protocol.
+                Falls back to JSON if msgpack is missing or the server rejects it.
+            auth_cache: Previously persisted auth state (see get_auth_cache)
+            auth_cache_callback: Called with the new auth state whenever it
+                changes, so it can be persisted
+            devices_callback: Called with the device catalog each time
+                GetDevices returns a non-empty list
+            hub: Connection hub shared with other accounts. If omitted,
+                the client gets a private one.
         """
         self.login = email
         self.password = password
         self._state_callback = state_callback
+        self._devices_callback = devices_callback
+
+        # Version scrape, timers and device routing shared across accounts
+        self.hub = hub or ConnectionHub(session)
+        self.hub.attach(self)
+
+        # One pooled keep-alive session for all HTTP calls (auth, negotiate, delete)
+        if session is None:
+            session = self.hub.session
+        self._session = session
+        self._owns_session = session is None
 
         self.base_url = "https://monitoring.tecel.ru"
         self.passport_url = f"{self.base_url}/passport/api"
@@ -44,44 +373,144 @@ class PrizrakClient:
         self.running = False
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = 999999
-        self.reconnect_delay = 5
-        self.invocation_counter = 0
+        self.scheduler = ReconnectScheduler()
+        self.delete_deadline = 5.0  # seconds to wait for a stale connection delete
+        self._failure_kind = FAILURE_NETWORK
+        self._retry_immediately = False
         self.devices = []
-        self.device_states = {}
+        self.device_states: Dict[int, DeviceRecord] = {}
         self.last_auth_time = 0
         self.auth_validity_hours = 12
         self.last_message_time = 0
         self.last_event_time = 0
+        # Last EventObject per device, unchanged (dropped) ones included
+        self.device_event_times: Dict[int, float] = {}
         self.message_timeout = 60
         self.event_timeout = 120  # Если нет EventObject 2 минуты - переподключение
         self.ping_interval = 15
         self.last_ping_time = 0
+        self.health_interval = 10
+        # Monotonic due times, served by the hub's timer loop
+        self.next_ping_at = 0.0
+        self.next_health_at = 0.0
+
+        # Resource usage, reported per account by the hub
+        self.messages_received = 0
+        self.events_received = 0
+        self.events_unchanged = 0
+        self.bytes_received = 0
+        self.pings_sent = 0
 
         # Event to signal when devices are ready
         self.devices_ready = asyncio.Event()
 
-        # Track pending command invocations
-        self.pending_invocations: Dict[str, asyncio.Future] = {}
-
-        # Track GetDevices invocation id to detect its response
-        self.get_devices_invocation_id: Optional[str] = None
+        # Pending hub invocations (GetDevices, WatchDevice, commands)
+        self.rpc = RpcMultiplexer()
+        self.get_devices_timeout = 60.0
+        self.watch_timeout = 30.0
+        # Large fleets subscribe in chunks, at most watch_rate chunks per second
+        self.watch_chunk_size = 50
+        self.watch_rate = 5.0
+        self._devices_task: Optional[asyncio.Task] = None
+
+        # Hub protocol used on the current connection
+        if use_messagepack and msgpack is None:
+            _LOGGER.warning("MessagePack protocol requested but msgpack is not installed, using JSON")
+        self.prefer_messagepack = use_messagepack and msgpack is not None
+        self._json_protocol = JsonHubProtocol()
+        self._messagepack_protocol = MessagePackHubProtocol() if msgpack is not None else None
+        self.protocol = self._json_protocol
+        _LOGGER.debug(f"JSON codec: {self._json_protocol.codec.name}")
+
+        # Splits incoming frames into SignalR records
+        self._parser = self.protocol.create_parser()
+
+        # Stateful reconnect: resume the same connection token after a drop
+        self.stateful_reconnect = True
+        self.use_stateful_reconnect = False  # Set when the server agrees
+        self.resume_window = 30  # seconds the server keeps a dropped session
+        self.resume_delay = 1
+        self.ack_interval = 5
+        self.ack_batch = 16
+        self._sequence = MessageSequence()
+        self._disconnected_at = 0.0
+        self._resuming = False
+        self.last_reconnect_gap: Optional[float] = None
+        self._last_ack_time = 0.0
 
         # App version (fetched once at startup)
         self.app_version: Optional[str] = None
         # Frontend web version (from passport.js?v=X.X.XXX)
         self.frontend_version: Optional[str] = None
 
-    def _fetch_app_version_sync(self) -> str:
-        """Fetch current app version from passport.js (synchronous)."""
+        # Duration (ms) of the last CheckLogin / Authorization / negotiate calls
+        self.timings: Dict[str, float] = {}
+
+        # Persisted auth state lets a restart skip the version scrape and login
+        self._auth_cache_callback = auth_cache_callback
+        if auth_cache:
+            self.restore_auth_cache(auth_cache)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled HTTP session, creating one if needed."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+            self._owns_session = True
+        return self._session
+
+    async def close(self):
+        """Close the HTTP session if it is owned by this client."""
+        if self._owns_session and self._session and not self._session.closed:
+            await self._session.close()
+
+    def get_auth_cache(self) -> Dict[str, Any]:
+        """Return the auth state worth persisting across restarts."""
+        return {
+            "app_version": self.app_version,
+            "frontend_version": self.frontend_version,
+            "auth_token": self.auth_token,
+            "last_auth_time": self.last_auth_time,
+        }
+
+    def restore_auth_cache(self, cache: Dict[str, Any]):
+        """Restore auth state saved by get_auth_cache."""
+        self.app_version = cache.get("app_version")
+        self.frontend_version = cache.get("frontend_version")
+        self.auth_token = cache.get("auth_token")
+        self.last_auth_time = cache.get("last_auth_time") or 0
+        if self.check_auth_validity():
+            _LOGGER.info(f"Restored cached auth (app version {self.app_version})")
+
+    def _notify_auth_changed(self):
+        """Hand the current auth state to the persistence callback."""
+        if self._auth_cache_callback:
+            try:
+                self._auth_cache_callback(self.get_auth_cache())
+            except Exception as e:
+                _LOGGER.error(f"Error in auth cache callback: {e}")
+
+    def _invalidate_auth(self):
+        """Drop the auth token so the next attempt logs in again."""
+        self.auth_token = None
+        self._notify_auth_changed()
+
+    def _record_timing(self, name: str, started: float):
+        """Store the duration of an HTTP step in milliseconds."""
+        self.timings[name] = round((time.monotonic() - started) * 1000, 1)
+
+    async def _fetch_app_version(self) -> str:
+        """Fetch current app version from passport.js."""
+        session = self._get_session()
         try:
             # Get main page to find passport.js URL
             _LOGGER.info("Fetching app version from monitoring.tecel.ru...")
-            response = requests.get(f"{self.base_url}/", timeout=10)
-            if response.status_code != 200:
-                raise Exception(f"Failed to fetch main page: {response.status_code}")
+            async with session.get(f"{self.base_url}/", timeout=HTTP_TIMEOUT) as response:
+                if response.status != 200:
+                    raise Exception(f"Failed to fetch main page: {response.status}")
+                page = await response.text()
 
             # Find passport.js URL
-            passport_match = re.search(r'src="(passport/passport\.js\?v=[^"]+)"', response.text)
+            passport_match = re.search(r'src="(passport/passport\.js\?v=[^"]+)"', page)
             if not passport_match:
                 raise Exception("passport.js URL not found in main page")
 
@@ -95,12 +524,13 @@ class PrizrakClient:
                 _LOGGER.info(f"Detected frontend version: {self.frontend_version}")
 
             # Fetch passport.js
-            response = requests.get(passport_url, timeout=10)
-            if response.status_code != 200:
-                raise Exception(f"Failed to fetch passport.js: {response.status_code}")
+            async with session.get(passport_url, timeout=HTTP_TIMEOUT) as response:
+                if response.status != 200:
+                    raise Exception(f"Failed to fetch passport.js: {response.status}")
+                passport_js = await response.text()
 
             # Extract app version from window.tec.passport.version
-            version_match = re.search(r'version:\s*"(\d+\.\d+\.\d+\.\d+)"', response.text)
+            version_match = re.search(r'version:\s*"(\d+\.\d+\.\d+\.\d+)"', passport_js)
             if not version_match:
                 raise Exception("Version not found in passport.js")
 
@@ -112,11 +542,18 @@ class PrizrakClient:
             _LOGGER.warning(f"Failed to fetch app version: {e}, using fallback 271.0.0.0")
             return "271.0.0.0"
 
-    def _get_fingerprint_token(self) -> str:
+    async def _scrape_versions(self) -> Tuple[str, Optional[str]]:
+        """Return (app_version, frontend_version) scraped from the site."""
+        app_version = await self._fetch_app_version()
+        return app_version, self.frontend_version
+
+    async def _get_fingerprint_token(self) -> str:
         """Generate fingerprint token for vtoken."""
-        # Fetch version on first use
+        # Fetch version on first use (one scrape shared by all accounts)
         if not self.app_version:
-            self.app_version = self._fetch_app_version_sync()
+            self.app_version, frontend_version = await self.hub.get_app_version(self._scrape_versions)
+            if frontend_version:
+                self.frontend_version = frontend_version
 
         data = {
             "VTokenKey": "x-vtoken",
@@ -127,15 +564,23 @@ class PrizrakClient:
         }
         return base64.b64encode(json.dumps(data).encode()).decode()
 
-    def _authenticate_sync(self) -> bool:
-        """Synchronous authentication - internal use only."""
+    async def authenticate(self) -> bool:
+        """Authenticate using login/password via passport API."""
+        result = await self._authenticate()
+        # Persist the new token, or the app version reset after versionError
+        self._notify_auth_changed()
+        return result
+
+    async def _authenticate(self) -> bool:
+        """Run CheckLogin and Authorization against the passport API."""
+        session = self._get_session()
         try:
             _LOGGER.info(f"Authenticating user: {self.login}")
 
             headers = {
                 'content-type': 'application/json',
                 'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'x-vtoken': self._get_fingerprint_token()
+                'x-vtoken': await self._get_fingerprint_token()
             }
 
             # Step 1: CheckLogin
@@ -149,12 +594,15 @@ class PrizrakClient:
                 }
             }
 
-            response = requests.post(self.passport_url, json=check_payload, headers=headers, timeout=10)
-            if response.status_code != 200:
-                _LOGGER.error(f"CheckLogin failed: {response.status_code}")
-                return False
-
-            check_result = response.json()
+            started = time.monotonic()
+            async with session.post(
+                self.passport_url, json=check_payload, headers=headers, timeout=HTTP_TIMEOUT
+            ) as response:
+                if response.status != 200:
+                    _LOGGER.error(f"CheckLogin failed: {response.status}")
+                    return False
+                check_result = await response.json(content_type=None)
+            self._record_timing("check_login", started)
             _LOGGER.debug(f"CheckLogin result: {check_result}")
 
             # Step 2: Authorization
@@ -170,17 +618,20 @@ class PrizrakClient:
                 }
             }
 
-            response = requests.post(self.passport_url, json=auth_payload, headers=headers, timeout=10)
-            if response.status_code != 200:
-                _LOGGER.error(f"Authorization failed: {response.status_code}")
-                return False
-
-            auth_result = response.json()
+            started = time.monotonic()
+            async with session.post(
+                self.passport_url, json=auth_payload, headers=headers, timeout=HTTP_TIMEOUT
+            ) as response:
+                if response.status != 200:
+                    _LOGGER.error(f"Authorization failed: {response.status}")
+                    return False
+                auth_result = await response.json(content_type=None)
+                # Header lookup is case-insensitive
+                x_atoken = response.headers.get('x-atoken')
+            self._record_timing("authorization", started)
             _LOGGER.debug(f"Auth response: {auth_result}")
 
             # Check for x-atoken in response headers
-            x_atoken = response.headers.get('x-atoken') or response.headers.get('X-AToken')
-
             if x_atoken:
                 _LOGGER.info(f"Got Atoken from headers")
                 self.auth_token = x_atoken
@@ -214,6 +665,7 @@ class PrizrakClient:
                 error = auth_result.get('error', {})
                 if error.get('message') == 'versionError':
                     _LOGGER.warning("Version error detected, will re-fetch app version on next attempt")
+                    self.hub.invalidate_app_version(self.app_version)
                     self.app_version = None
                 return False
 
@@ -221,11 +673,6 @@ class PrizrakClient:
             _LOGGER.error(f"Authentication error: {e}")
             return False
 
-    async def authenticate(self) -> bool:
-        """Authenticate using login/password via passport API (async wrapper)."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self._authenticate_sync)
-
     def check_auth_validity(self) -> bool:
         """Check if we need to re-authenticate."""
         if not self.auth_token:
@@ -262,29 +709,55 @@ class PrizrakClient:
             'x-signalr-user-agent': 'Microsoft SignalR/7.0'
         }
 
-    def _negotiate_connection_sync(self) -> Optional[str]:
-        """Synchronous connection negotiation - internal use only."""
+    async def negotiate_connection(self) -> Optional[str]:
+        """Negotiate SignalR connection."""
         negotiate_url = f"{self.base_url}/api/Control/negotiate?negotiateVersion=1"
+        if self.stateful_reconnect:
+            negotiate_url += "&useStatefulReconnect=true"
+        session = self._get_session()
         try:
             _LOGGER.info("Negotiating SignalR connection...")
-            response = requests.post(negotiate_url, headers=self._get_headers(), timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                _LOGGER.debug(f"Negotiate response: {data}")
-                connection_token = data.get('connectionToken')
-                _LOGGER.info(f"Connection negotiated successfully")
-                return connection_token
-            else:
-                _LOGGER.error(f"Negotiate failed: {response.status_code}")
-                return None
+            started = time.monotonic()
+            async with session.post(
+                negotiate_url, headers=self._get_headers(), timeout=HTTP_TIMEOUT
+            ) as response:
+                if response.status == 401:
+                    _LOGGER.warning("Negotiate rejected token (HTTP 401), forcing re-authentication...")
+                    self._invalidate_auth()
+                    self._failure_kind = FAILURE_AUTH
+                    return None
+                if response.status != 200:
+                    _LOGGER.error(f"Negotiate failed: {response.status}")
+                    self._failure_kind = FAILURE_SERVER if response.status >= 500 else FAILURE_NETWORK
+                    return None
+                data = await response.json(content_type=None)
+            self._record_timing("negotiate", started)
+            _LOGGER.debug(f"Negotiate response: {data}")
+            connection_token = data.get('connectionToken')
+            self.use_stateful_reconnect = self.stateful_reconnect and bool(data.get('useStatefulReconnect'))
+            if self.use_stateful_reconnect:
+                _LOGGER.debug("Server enabled stateful reconnect")
+            if self.prefer_messagepack and not self._supports_binary(data):
+                _LOGGER.warning("Server does not offer binary WebSocket transport, falling back to JSON protocol")
+                self.prefer_messagepack = False
+            _LOGGER.info(f"Connection negotiated successfully")
+            _LOGGER.debug(f"HTTP timings (ms): {self.timings}")
+            return connection_token
         except Exception as e:
             _LOGGER.error(f"Negotiation error: {e}")
             return None
 
-    async def negotiate_connection(self) -> Optional[str]:
-        """Negotiate SignalR connection (async wrapper)."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self._negotiate_connection_sync)
+    @staticmethod
+    def _supports_binary(negotiate_data: Dict[str, Any]) -> bool:
+        """Check whether the negotiate response allows binary WebSocket frames."""
+        transports = negotiate_data.get('availableTransports')
+        if not transports:
+            # Older servers do not list transports; let the handshake decide
+            return True
+        for transport in transports:
+            if transport.get('transport') == "WebSockets":
+                return "Binary" in transport.get('transferFormats', [])
+        return False
 
     async def delete_connection(self, connection_id: str):
         """Delete an existing connection on the server."""
@@ -292,37 +765,70 @@ class PrizrakClient:
             delete_url = f"{self.base_url}/api/Control?id={connection_id}"
             _LOGGER.info(f"Attempting to delete existing connection...")
 
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: requests.delete(delete_url, headers=self._get_headers(), timeout=5)
-            )
+            async with self._get_session().delete(
+                delete_url, headers=self._get_headers(), timeout=DELETE_TIMEOUT
+            ) as response:
+                status = response.status
 
-            if response.status_code in [200, 204, 404]:
-                _LOGGER.info(f"Existing connection deleted or already gone (HTTP {response.status_code})")
+            if status in [200, 204, 404]:
+                _LOGGER.info(f"Existing connection deleted or already gone (HTTP {status})")
                 return True
             else:
-                _LOGGER.warning(f"Delete connection returned HTTP {response.status_code}")
+                _LOGGER.warning(f"Delete connection returned HTTP {status}")
                 return False
         except Exception as e:
             _LOGGER.warning(f"Failed to delete connection: {e}")
             return False
 
     def _cleanup_pending_invocations(self):
-        """Cancel all pending invocations (called on disconnect/reconnect)."""
-        if self.pending_invocations:
-            _LOGGER.warning(f"Cleaning up {len(self.pending_invocations)} pending invocations")
-            for invocation_id, future in self.pending_invocations.items():
-                if not future.done():
-                    future.set_result({
-                        "success": False,
-                        "error": "Connection lost"
-                    })
-            self.pending_invocations.clear()
+        """Fail all pending invocations (called on disconnect/reconnect)."""
+        self.rpc.fail_all(ConnectionLostError("Connection lost"))
 
-    async def connect_websocket(self) -> bool:
-        # Cleanup any pending commands from previous connection
+    def _can_resume(self) -> bool:
+        """Check whether the dropped session can be resumed."""
+        if not (self.use_stateful_reconnect and self.connection_id):
+            return False
+        if self._sequence.overflowed:
+            _LOGGER.info("Too many unacknowledged messages, renegotiating instead of resuming")
+            return False
+        if time.time() - self._disconnected_at > self.resume_window:
+            _LOGGER.info("Resume window expired, renegotiating")
+            return False
+        return True
+
+    def _on_disconnected(self) -> float:
+        """Record a dropped connection and return the delay before reconnecting."""
+        self._disconnected_at = time.time()
+        self.scheduler.mark_disconnected()
+        if self._resuming:
+            # Closed before the server's Sequence message: resume refused
+            _LOGGER.info("Server refused session resume, renegotiating")
+            self._resuming = False
+            self.connection_id = None
+        if self.use_stateful_reconnect and self.connection_id:
+            return self.scheduler.next_delay(self.resume_delay)
+        self.connection_id = None
+        # Not resumable: fail waiting callers now rather than at the next connect
         self._cleanup_pending_invocations()
+        return self.scheduler.next_delay()
+
+    async def _delete_stale_connection(self, connection_id: str) -> bool:
+        """Delete a conflicting connection, waiting at most delete_deadline."""
+        try:
+            return await asyncio.wait_for(self.delete_connection(connection_id), timeout=self.delete_deadline)
+        except asyncio.TimeoutError:
+            _LOGGER.warning(f"Deleting stale connection did not finish within {self.delete_deadline}s")
+            return False
+
+    async def connect_websocket(self) -> bool:
+        self._resuming = self._can_resume()
+        self._failure_kind = FAILURE_NETWORK
+
+        if not self._resuming:
+            # Cleanup any pending commands from previous connection
+            self._cleanup_pending_invocations()
+            self._sequence.reset()
+            self.connection_id = None
 
         if not self.connection_id:
             self.connection_id = await self.negotiate_connection()
@@ -353,25 +859,27 @@ class PrizrakClient:
 
             if status_code:
                 _LOGGER.error(f"WebSocket rejected: HTTP {status_code}")
-                if status_code == 404:
+                if status_code == 404 and self._resuming:
+                    _LOGGER.info("HTTP 404 - session expired on server, renegotiating...")
+                    self.connection_id = None
+                elif status_code == 404:
                     _LOGGER.warning(f"HTTP 404 - connection_id invalid, forcing re-negotiation...")
                     self.connection_id = None
-                    self.auth_token = None
+                    self._invalidate_auth()
                 elif status_code == 401:
                     _LOGGER.warning(f"HTTP 401 - auth failed, forcing re-authentication...")
-                    self.auth_token = None
+                    self._invalidate_auth()
+                    self._failure_kind = FAILURE_AUTH
                 elif status_code == 409:
                     _LOGGER.warning(f"HTTP 409 - connection exists, deleting old connection...")
-                    # Try to delete the existing connection
                     old_conn_id = self.connection_id
-                    # Run delete in a new task to avoid blocking the reconnect loop
-                    asyncio.create_task(self.delete_connection(old_conn_id))
-                    # Force new negotiation immediately
                     self.connection_id = None
-                    await asyncio.sleep(2)  # Give server time to process delete
+                    # Once the server confirms the delete, renegotiate without backoff
+                    self._retry_immediately = await self._delete_stale_connection(old_conn_id)
                 elif status_code >= 500:
                     _LOGGER.warning(f"HTTP {status_code} - server error, will retry...")
                     self.connection_id = None
+                    self._failure_kind = FAILURE_SERVER
                 else:
                     _LOGGER.error(f"Unhandled HTTP code: {status_code}")
                     self.connection_id = None
@@ -383,30 +891,77 @@ class PrizrakClient:
 
             return False
 
+    async def _send_frame(self, frame: bytes):
+        """Send an encoded record as a text or binary frame per protocol."""
+        await self.websocket.send(frame, text=self.protocol.text_frames)
+
+    async def _send_invocation(self, request: Dict[str, Any]):
+        """Encode and send a sequenced message, buffering it for resume."""
+        frame = self.protocol.encode(request)
+        if self.use_stateful_reconnect:
+            self._sequence.track_sent(frame)
+        await self._send_frame(frame)
+
+    async def _send_ack(self):
+        """Acknowledge received sequenced messages if anything is new."""
+        if not self.use_stateful_reconnect:
+            return
+        last_received = self._sequence.last_received
+        if last_received > self._sequence.last_ack_sent:
+            await self._send_frame(self.protocol.encode({"type": MSG_ACK, "sequenceId": last_received}))
+            self._sequence.last_ack_sent = last_received
+            self._last_ack_time = time.time()
+
+    async def _resume_session(self):
+        """Replay unacknowledged messages after reconnecting to the same session.
+
+        A resumed connection has no handshake: the first message each side
+        sends is a Sequence message, the server's one is handled (and the
+        resume confirmed) in _dispatch_message().
+        """
+        self._parser = self.protocol.create_parser()
+        unacked = list(self._sequence.unacked)
+        await self._send_frame(self.protocol.encode({"type": MSG_SEQUENCE, "sequenceId": self._sequence.resend_from()}))
+        for _, frame in unacked:
+            await self._send_frame(frame)
+        _LOGGER.info(f"Resuming session ({len(unacked)} message(s) replayed)")
+
     async def send_handshake(self):
-        handshake = {"protocol": "json", "version": 1}
-        await self.websocket.send(json.dumps(handshake) + '\x1e')
-        _LOGGER.info("Handshake sent")
+        self.protocol = self._messagepack_protocol if self.prefer_messagepack else self._json_protocol
+        # Servers only keep stateful reconnect on for hub protocol version 2
+        version = 2 if self.use_stateful_reconnect else 1
+        # The handshake itself is always JSON text, whatever protocol it selects
+        await self.websocket.send(self.protocol.handshake_frames[version], text=True)
+        _LOGGER.info(f"Handshake sent (protocol={self.protocol.name}, version={version})")
 
     async def receive_handshake_response(self) -> bool:
-        """Read and verify SignalR handshake response from server."""
+        """Read and verify SignalR handshake response from server.
+
+        The handshake response is the first \\x1e-terminated JSON record on the
+        connection. Any records the server sent in the same frame are handed to
+        the protocol parser and dispatched by receive_messages().
+        """
+        handshake_parser = SignalRRecordParser()
         try:
-            response = await asyncio.wait_for(self.websocket.recv(), timeout=10.0)
-            if isinstance(response, bytes):
-                response = response.decode('utf-8')
-
-            # Response may contain multiple \x1e-separated messages
-            for part in response.split('\x1e'):
-                part = part.strip()
-                if not part:
-                    continue
-                try:
-                    data = json.loads(part)
-                    if data.get('error'):
-                        _LOGGER.error(f"SignalR handshake rejected by server: {data['error']}")
-                        return False
-                except json.JSONDecodeError:
-                    pass
+            record = None
+            while record is None:
+                frame = await asyncio.wait_for(self.websocket.recv(), timeout=10.0)
+                handshake_parser.feed(frame)
+                record = handshake_parser.next_record()
+
+            try:
+                data = json.loads(record)
+                if data.get('error'):
+                    _LOGGER.error(f"SignalR handshake rejected by server: {data['error']}")
+                    if self.protocol.name != JsonHubProtocol.name:
+                        _LOGGER.warning(f"Protocol {self.protocol.name} rejected, falling back to JSON protocol")
+                        self.prefer_messagepack = False
+                    return False
+            except json.JSONDecodeError:
+                pass
+
+            self._parser = self.protocol.create_parser()
+            self._parser.feed(handshake_parser.remaining())
 
             _LOGGER.info("Handshake response OK")
             return True
@@ -422,32 +977,126 @@ class PrizrakClient:
             return False
 
     async def send_ping(self):
-        ping_msg = {"type": 6}
-        await self.websocket.send(json.dumps(ping_msg) + '\x1e')
+        await self._send_frame(self.protocol.ping_frame)
+        self.pings_sent += 1
         _LOGGER.debug("Ping sent")
 
-    async def get_devices(self):
-        self.invocation_counter += 1
-        self.get_devices_invocation_id = str(self.invocation_counter)
-        request = {
-            "type": 1,
-            "invocationId": self.get_devices_invocation_id,
-            "target": "GetDevices",
-            "arguments": [{"registrations": True, "custom_fields": True, "possible_commands": True}]
-        }
-        await self.websocket.send(json.dumps(request, ensure_ascii=False) + '\x1e')
-        _LOGGER.info(f"GetDevices request sent (invocationId={self.get_devices_invocation_id})")
+    async def invoke(self, target: str, arguments: list, timeout: float) -> Any:
+        """Invoke a hub method and wait for its completion.
 
-    async def watch_devices(self, device_ids):
-        self.invocation_counter += 1
+        Args:
+            target: Hub method name
+            arguments: Invocation arguments
+            timeout: Seconds to wait for the completion
+
+        Returns:
+            The completion result
+
+        Raises:
+            InvocationError: Server completed the call with an error
+            asyncio.TimeoutError: No completion within timeout
+            ConnectionLostError: Connection dropped before the completion
+        """
+        pending = self.rpc.create(target, timeout)
         request = {
             "type": 1,
-            "invocationId": str(self.invocation_counter),
-            "target": "WatchDevice",
-            "arguments": [{"device_ids": device_ids}]
+            "invocationId": pending.invocation_id,
+            "target": target,
+            "arguments": arguments
         }
-        await self.websocket.send(json.dumps(request, ensure_ascii=False) + '\x1e')
-        _LOGGER.info(f"Subscribed to devices: {device_ids}")
+        try:
+            await self._send_invocation(request)
+            return await pending.future
+        finally:
+            # No-op once completed; frees the slot if send failed or caller was cancelled
+            self.rpc.discard(pending.invocation_id)
+
+    async def get_devices(self):
+        """Request the device list; the reply is handled in the background."""
+        self._devices_task = asyncio.create_task(self._load_devices())
+
+    async def _load_devices(self):
+        """Fetch the device list and subscribe to its updates."""
+        _LOGGER.info("GetDevices request sent")
+        try:
+            result = await self.invoke(
+                "GetDevices",
+                [{"registrations": True, "custom_fields": True, "possible_commands": True}],
+                self.get_devices_timeout
+            )
+            devices_data = result.get('data', {}).get('devices', []) if isinstance(result, dict) else None
+            if devices_data:
+                # Devices shared with another account are served by that one
+                devices_data = self.hub.claim_devices(self, devices_data)
+                self.devices = devices_data
+                _LOGGER.info(f"Found {len(devices_data)} device(s):")
+                for dev in devices_data:
+                    _LOGGER.info(f"   • {dev.get('name')} ({dev.get('model')}) - ID: {dev.get('device_id')}")
+                if self._devices_callback:
+                    try:
+                        self._devices_callback(devices_data)
+                    except Exception as e:
+                        _LOGGER.error(f"Error in devices callback: {e}")
+                device_ids = [d['device_id'] for d in devices_data]
+                if device_ids:
+                    await self.watch_devices(device_ids)
+            elif devices_data is not None:
+                _LOGGER.warning(f"GetDevices returned empty device list. Raw result: {result}")
+            else:
+                _LOGGER.warning(f"GetDevices unexpected response: result={result}")
+        except InvocationError as e:
+            _LOGGER.error(f"GetDevices error from server: {e}")
+        except asyncio.TimeoutError:
+            _LOGGER.error(f"GetDevices timeout - no response in {self.get_devices_timeout}s")
+        except ConnectionLostError:
+            _LOGGER.warning("Connection lost before GetDevices completed")
+        except Exception as e:
+            _LOGGER.error(f"GetDevices failed: {e}")
+        finally:
+            # Signal ready regardless — HA won't hang forever
+            if not self.devices_ready.is_set():
+                self.devices_ready.set()
+                _LOGGER.info("Devices ready event set")
+
+    async def watch_devices(self, device_ids) -> bool:
+        """Subscribe to EventObject updates for the given devices.
+
+        Devices are subscribed watch_chunk_size at a time, with chunks
+        spaced 1/watch_rate seconds apart, so a fleet of hundreds does not
+        land on the server as one huge invocation. A rejected chunk does
+        not stop the rest.
+
+        Returns:
+            True if every chunk was accepted
+        """
+        device_ids = list(device_ids)
+        size = max(1, self.watch_chunk_size)
+        chunks = [device_ids[i:i + size] for i in range(0, len(device_ids), size)]
+        interval = 1.0 / self.watch_rate if self.watch_rate > 0 else 0.0
+
+        subscribed = 0
+        next_send = time.monotonic()
+        for index, chunk in enumerate(chunks, start=1):
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            next_send = time.monotonic() + interval
+
+            try:
+                await self.invoke("WatchDevice", [{"device_ids": chunk}], self.watch_timeout)
+            except InvocationError as e:
+                _LOGGER.error(f"WatchDevice rejected for chunk {index}/{len(chunks)}: {e}")
+                continue
+            except asyncio.TimeoutError:
+                _LOGGER.error(f"WatchDevice timeout for chunk {index}/{len(chunks)} - no response from server")
+                continue
+            subscribed += len(chunk)
+
+        if len(chunks) > 1:
+            _LOGGER.info(f"Subscribed to {subscribed}/{len(device_ids)} devices in {len(chunks)} chunks")
+        else:
+            _LOGGER.info(f"Subscribed to devices: {device_ids}")
+        return subscribed == len(device_ids)
 
     async def send_command(self, device_id: int, command: str, timeout: float = 10.0):
         """Send command to device via WebSocket and wait for response.
@@ -465,48 +1114,20 @@ class PrizrakClient:
             _LOGGER.error("WebSocket not connected")
             return False
 
-        self.invocation_counter += 1
-        invocation_id = str(self.invocation_counter)
-
-        request = {
-            "type": 1,
-            "invocationId": invocation_id,
-            "target": command,
-            "arguments": [{"device_id": device_id}]
-        }
-
-        # Create Future for waiting response
-        future = asyncio.Future()
-        self.pending_invocations[invocation_id] = future
-
         try:
-            # Send command with timeout
-            await asyncio.wait_for(
-                self.websocket.send(json.dumps(request, ensure_ascii=False) + '\x1e'),
-                timeout=5.0
-            )
-            _LOGGER.info(f"Sent command {command} to device {device_id} (invocationId={invocation_id})")
-
-            # Wait for server response
-            result = await asyncio.wait_for(future, timeout=timeout)
-
-            if result.get("success", False):
-                _LOGGER.info(f"Command {command} confirmed successful by server (invocationId={invocation_id})")
-                return True
-            else:
-                error_msg = result.get("error", "Unknown error")
-                _LOGGER.error(f"Command {command} failed: {error_msg} (invocationId={invocation_id})")
-                return False
-
+            _LOGGER.info(f"Sending command {command} to device {device_id}")
+            await self.invoke(command, [{"device_id": device_id}], timeout)
+            _LOGGER.info(f"Command {command} confirmed successful by server (device {device_id})")
+            return True
+        except InvocationError as e:
+            _LOGGER.error(f"Command {command} failed: {e} (device {device_id})")
+            return False
         except asyncio.TimeoutError:
-            _LOGGER.error(f"Command {command} timeout - no response from server (invocationId={invocation_id})")
+            _LOGGER.error(f"Command {command} timeout - no response from server (device {device_id})")
             return False
         except Exception as e:
-            _LOGGER.error(f"Failed to send command {command}: {e} (invocationId={invocation_id})")
+            _LOGGER.error(f"Failed to send command {command}: {e} (device {device_id})")
             return False
-        finally:
-            # Cleanup pending invocation
-            self.pending_invocations.pop(invocation_id, None)
 
     def handle_event_object(self, arguments):
         """Handle EventObject - device state updates."""
@@ -520,15 +1141,27 @@ class PrizrakClient:
         device_id = event_data.get('device_id')
         device_state = event_data.get('device_state', {})
 
-        if device_id:
-            if device_id not in self.device_states:
-                self.device_states[device_id] = {}
+        if device_id and not self.hub.serves(self, device_id):
+            # Routed to the account that owns this device
+            return
 
-            self.device_states[device_id].update(device_state)
+        if device_id:
+            self.events_received += 1
+            self.device_event_times[device_id] = self.last_event_time
+            record = self.device_states.get(device_id)
+            if record is None:
+                record = self.device_states[device_id] = DeviceRecord()
+
+            changed = record.merge(device_state)
+            if not changed:
+                # Repeats known values, nothing for Home Assistant to do
+                self.events_unchanged += 1
+                _LOGGER.debug(f"Device Update [{device_id}] unchanged, dropped")
+                return
 
             # Call Home Assistant callback
             try:
-                self._state_callback(device_id, device_state)
+                self._state_callback(device_id, device_state, changed)
             except Exception as e:
                 _LOGGER.error(f"Error in state callback: {e}")
 
@@ -549,6 +1182,65 @@ class PrizrakClient:
             if alarm and alarm not in ["Unknown", "None"]:
                 _LOGGER.warning(f"  ALARM: {alarm}")
 
+    async def _dispatch_message(self, data: Dict[str, Any]):
+        """Process a single decoded SignalR hub message."""
+        msg_type = data.get('type')
+
+        if self.use_stateful_reconnect:
+            if msg_type in SEQUENCED_MESSAGE_TYPES:
+                if not self._sequence.receive():
+                    # Replayed after resume, already processed
+                    return
+            elif msg_type == MSG_ACK:
+                self._sequence.ack(data.get('sequenceId', 0))
+                return
+            elif msg_type == MSG_SEQUENCE:
+                self._sequence.next_receive_id = data.get('sequenceId', 1)
+                if self._resuming:
+                    self._resuming = False
+                    self.last_reconnect_gap = time.time() - self._disconnected_at
+                    _LOGGER.info(f"Session resumed after {self.last_reconnect_gap:.1f}s")
+                return
+
+        if msg_type == 6:
+            _LOGGER.debug("Ping received, sending pong")
+            await self.send_ping()
+
+        elif msg_type == 1:
+            target = data.get('target')
+            arguments = data.get('arguments', [])
+
+            if target == "EventObject":
+                self.handle_event_object(arguments)
+            else:
+                _LOGGER.debug(f"Invocation: {target}")
+
+        elif msg_type == 3:
+            # Type 3 = Completion (response to invocation)
+            invocation_id = data.get('invocationId')
+            result = data.get('result')
+            error = data.get('error')
+
+            _LOGGER.debug(f"Response to invocation {invocation_id}: error={error}")
+
+            self.rpc.complete(invocation_id, result, error)
+
+    async def _process_records(self):
+        """Decode and dispatch every complete record buffered in the parser."""
+        for record in self._parser:
+            try:
+                await self._dispatch_message(self.protocol.decode(record))
+            except ValueError:
+                _LOGGER.debug(f"Malformed {self.protocol.name} message")
+            except Exception as e:
+                _LOGGER.error(f"Error processing message: {e}")
+
+        # Ack in batches so the server can trim its replay buffer
+        if self.use_stateful_reconnect:
+            unacked = self._sequence.last_received - self._sequence.last_ack_sent
+            if unacked >= self.ack_batch or (unacked and time.time() - self._last_ack_time >= self.ack_interval):
+                await self._send_ack()
+
     async def receive_messages(self):
         """Receive and process WebSocket messages."""
         try:
@@ -556,85 +1248,18 @@ class PrizrakClient:
             message_count = 0
             _LOGGER.debug("receive_messages: starting loop")
 
+            # Records that arrived together with the handshake response
+            await self._process_records()
+
             async for message in self.websocket:
                 message_count += 1
-                try:
-                    self.last_message_time = time.time()
-
-                    if isinstance(message, bytes):
-                        message = message.decode('utf-8')
-
-                    cleaned = message.strip('\x1e')
-                    if not cleaned:
-                        continue
-
-                    data = json.loads(cleaned)
-                    msg_type = data.get('type')
-
-                    if msg_type == 6:
-                        _LOGGER.debug("Ping received, sending pong")
-                        await self.send_ping()
+                self.messages_received += 1
+                self.bytes_received += len(message)
+                self.last_message_time = time.time()
 
-                    elif msg_type == 1:
-                        target = data.get('target')
-                        arguments = data.get('arguments', [])
-
-                        if target == "EventObject":
-                            self.handle_event_object(arguments)
-                        else:
-                            _LOGGER.debug(f"Invocation: {target}")
-
-                    elif msg_type == 3:
-                        # Type 3 = Completion (response to invocation)
-                        invocation_id = data.get('invocationId')
-                        result = data.get('result')
-                        error = data.get('error')
-
-                        _LOGGER.debug(f"Response to invocation {invocation_id}: error={error}")
-
-                        # Check if this is a pending command waiting for response
-                        if invocation_id in self.pending_invocations:
-                            future = self.pending_invocations[invocation_id]
-                            if not future.done():
-                                if error:
-                                    # Server returned error
-                                    future.set_result({
-                                        "success": False,
-                                        "error": error
-                                    })
-                                else:
-                                    # Command successful
-                                    future.set_result({
-                                        "success": True,
-                                        "result": result
-                                    })
-
-                        # Handle GetDevices response
-                        if invocation_id == self.get_devices_invocation_id:
-                            if error:
-                                _LOGGER.error(f"GetDevices error from server: {error}")
-                            elif result and isinstance(result, dict):
-                                devices_data = result.get('data', {}).get('devices', [])
-                                if devices_data:
-                                    self.devices = devices_data
-                                    _LOGGER.info(f"Found {len(devices_data)} device(s):")
-                                    for dev in devices_data:
-                                        _LOGGER.info(f"   • {dev.get('name')} ({dev.get('model')}) - ID: {dev.get('device_id')}")
-                                    device_ids = [d['device_id'] for d in devices_data]
-                                    await self.watch_devices(device_ids)
-                                else:
-                                    _LOGGER.warning(f"GetDevices returned empty device list. Raw result: {result}")
-                            else:
-                                _LOGGER.warning(f"GetDevices unexpected response: result={result}, error={error}")
-                            # Signal ready regardless — HA won't hang forever
-                            if not self.devices_ready.is_set():
-                                self.devices_ready.set()
-                                _LOGGER.info("Devices ready event set")
-
-                except json.JSONDecodeError:
-                    _LOGGER.debug(f"Non-JSON message")
-                except Exception as e:
-                    _LOGGER.error(f"Error processing message: {e}")
+                # A frame may carry several records, or only part of one
+                self._parser.feed(message)
+                await self._process_records()
 
             # async for exhausted = server closed connection cleanly
             close = self.websocket.close_code
@@ -651,140 +1276,186 @@ class PrizrakClient:
             _LOGGER.warning("Connection timeout - no messages received")
             raise
 
-    async def send_proactive_pings(self):
-        """Send ping to server every 15 seconds to keep connection alive."""
-        while self.running:
-            await asyncio.sleep(self.ping_interval)
+    def next_timer_due(self) -> float:
+        """Return the monotonic time of the next keep-alive or health check."""
+        return min(self.next_ping_at, self.next_health_at)
 
-            if self.websocket:
-                try:
-                    await self.send_ping()
-                    self.last_ping_time = time.time()
-                    _LOGGER.debug(f"Proactive ping sent (keep-alive)")
-                except Exception as e:
-                    _LOGGER.error(f"Failed to send proactive ping: {e}")
-                    break
+    async def run_timers(self, now: float):
+        """Run the keep-alive ping and health check if they are due.
+
+        Called by the hub's timer loop while the connection is up.
+        """
+        if now >= self.next_ping_at:
+            self.next_ping_at = now + self.ping_interval
+            await self.send_proactive_ping()
+        if now >= self.next_health_at:
+            self.next_health_at = now + self.health_interval
+            await self.check_connection_health()
+
+    async def send_proactive_ping(self):
+        """Send a keep-alive ping (every 15 seconds)."""
+        if self.websocket:
+            try:
+                await self.send_ping()
+                await self._send_ack()
+                self.last_ping_time = time.time()
+                _LOGGER.debug(f"Proactive ping sent (keep-alive)")
+            except Exception as e:
+                _LOGGER.error(f"Failed to send proactive ping: {e}")
 
     async def check_connection_health(self):
-        """Monitor connection health and reconnect if needed."""
-        while self.running:
-            await asyncio.sleep(10)
+        """Close the connection if it looks dead so run() reconnects."""
+        if not self.websocket:
+            return
 
-            if self.websocket:
-                # Check for any messages (including ping/pong)
-                if self.last_message_time > 0:
-                    time_since_last_msg = time.time() - self.last_message_time
+        # Check for any messages (including ping/pong)
+        if self.last_message_time > 0:
+            time_since_last_msg = time.time() - self.last_message_time
 
-                    if time_since_last_msg > self.message_timeout:
-                        _LOGGER.warning(f"No messages for {int(time_since_last_msg)}s - connection may be dead")
-                        _LOGGER.info("Initiating reconnection...")
+            if time_since_last_msg > self.message_timeout:
+                _LOGGER.warning(f"No messages for {int(time_since_last_msg)}s - connection may be dead")
+                _LOGGER.info("Initiating reconnection...")
+                await self._close_for_reconnect()
+                return
 
-                        try:
-                            await self.websocket.close()
-                        except:
-                            pass
-                        break
+        # Check for EventObject specifically (device state updates)
+        if self.last_event_time > 0:
+            time_since_last_event = time.time() - self.last_event_time
 
-                # Check for EventObject specifically (device state updates)
-                if self.last_event_time > 0:
-                    time_since_last_event = time.time() - self.last_event_time
+            if time_since_last_event > self.event_timeout:
+                _LOGGER.warning(f"No EventObject updates for {int(time_since_last_event)}s - watch may be broken")
+                _LOGGER.info("Initiating reconnection to re-subscribe...")
+                # A resumed session would keep the broken watch, renegotiate
+                self.connection_id = None
+                await self._close_for_reconnect()
 
-                    if time_since_last_event > self.event_timeout:
-                        _LOGGER.warning(f"No EventObject updates for {int(time_since_last_event)}s - watch may be broken")
-                        _LOGGER.info("Initiating reconnection to re-subscribe...")
+    async def _close_for_reconnect(self):
+        """Stop the timers and close the WebSocket; run() takes it from there."""
+        self.hub.disconnected(self)
+        try:
+            await self.websocket.close()
+        except:
+            pass
 
-                        try:
-                            await self.websocket.close()
-                        except:
-                            pass
-                        break
+    def usage(self) -> Dict[str, Any]:
+        """Return this account's resource usage."""
+        return {
+            "connected": self.websocket is not None and self.connection_id is not None,
+            "protocol": self.protocol.name,
+            "devices": len(self.devices),
+            "messages_received": self.messages_received,
+            "events_received": self.events_received,
+            "events_unchanged": self.events_unchanged,
+            "bytes_received": self.bytes_received,
+            "pings_sent": self.pings_sent,
+            "pending_invocations": len(self.rpc),
+            "invocations": self.rpc.stats_by_target(),
+            "reconnect": self.scheduler.stats(),
+            "timings_ms": dict(self.timings),
+        }
 
     async def run(self):
         """Main run loop with auto-recovery."""
         self.running = True
 
-        # Initial authentication
-        if not await self.authenticate():
-            _LOGGER.error("Initial authentication failed!")
-            return
+        try:
+            # Initial authentication (skipped when a cached token is still valid)
+            if not self.check_auth_validity() and not await self.authenticate():
+                _LOGGER.error("Initial authentication failed!")
+                return
 
-        while self.running:
-            try:
-                # Check if token is still valid
-                if not self.check_auth_validity():
-                    if not await self.authenticate():
-                        _LOGGER.error("Re-authentication failed, retrying in 30s...")
-                        await asyncio.sleep(30)
-                        continue
+            while self.running:
+                try:
+                    # Check if token is still valid
+                    if not self.check_auth_validity():
+                        if not await self.authenticate():
+                            self.scheduler.record_failure(FAILURE_AUTH)
+                            delay = self.scheduler.next_delay()
+                            _LOGGER.error(f"Re-authentication failed, retrying in {delay:.1f}s...")
+                            await asyncio.sleep(delay)
+                            continue
+
+                    # Connect to WebSocket
+                    if await self.connect_websocket():
+                        if self._resuming:
+                            # Same session: no handshake, subscriptions and
+                            # device list are still valid
+                            await self._resume_session()
+                            self.scheduler.record_success()
+                        else:
+                            await self.send_handshake()
+                            if not await self.receive_handshake_response():
+                                self.connection_id = None
+                                self.scheduler.record_failure(FAILURE_NETWORK)
+                                await asyncio.sleep(self.scheduler.next_delay())
+                                continue
+                            self.scheduler.record_success()
+                            await self.send_ping()
+                            await self.get_devices()
+
+                        # Keep-alive and health timers run from the hub's shared loop
+                        now = time.monotonic()
+                        self.next_ping_at = now + self.ping_interval
+                        self.next_health_at = now + self.health_interval
+                        self.hub.connected(self)
 
-                # Connect to WebSocket
-                if await self.connect_websocket():
-                    await self.send_handshake()
-                    if not await self.receive_handshake_response():
-                        self.connection_id = None
-                        await asyncio.sleep(self.reconnect_delay)
+                        try:
+                            await self.receive_messages()
+                            # receive_messages() returned normally = server closed cleanly
+                            # Reconnect after a delay
+                            self.reconnect_attempts += 1
+                            await asyncio.sleep(self._on_disconnected())
+                        finally:
+                            # Stop the timers when receive_messages exits
+                            self.hub.disconnected(self)
+                    else:
+                        # Connection failed, wait before retry with jittered backoff
+                        self.scheduler.record_failure(self._failure_kind)
+                        if self._retry_immediately:
+                            self._retry_immediately = False
+                            delay = self.scheduler.next_delay(0)
+                        else:
+                            delay = self.scheduler.next_delay()
+                        _LOGGER.warning(f"WebSocket connection failed, retrying in {delay:.1f}s (attempt {self.reconnect_attempts + 1})...")
+                        self.reconnect_attempts += 1
+                        await asyncio.sleep(delay)
                         continue
-                    await self.send_ping()
-                    await self.get_devices()
 
-                    # Start background tasks
-                    ping_task = asyncio.create_task(self.send_proactive_pings())
-                    health_task = asyncio.create_task(self.check_connection_health())
-
-                    try:
-                        await self.receive_messages()
-                        # receive_messages() returned normally = server closed cleanly
-                        # Reset and reconnect after a delay
-                        self.reconnect_attempts += 1
-                        self.connection_id = None
-                        await asyncio.sleep(self.reconnect_delay)
-                    finally:
-                        # Cancel background tasks when receive_messages exits
-                        ping_task.cancel()
-                        health_task.cancel()
-                        try:
-                            await ping_task
-                        except asyncio.CancelledError:
-                            pass
-                        try:
-                            await health_task
-                        except asyncio.CancelledError:
-                            pass
-                else:
-                    # Connection failed, wait before retry with exponential backoff
-                    delay = min(self.reconnect_delay * (2 ** min(self.reconnect_attempts, 5)), 60)
-                    _LOGGER.warning(f"WebSocket connection failed, retrying in {delay}s (attempt {self.reconnect_attempts + 1})...")
+                except websockets.exceptions.ConnectionClosed as e:
+                    delay = self._on_disconnected()
+                    _LOGGER.warning(f"Connection closed (code={e.code}, reason={e.reason!r}), reconnecting in {delay:.1f}s...")
                     self.reconnect_attempts += 1
                     await asyncio.sleep(delay)
-                    continue
 
-            except websockets.exceptions.ConnectionClosed as e:
-                _LOGGER.warning(f"Connection closed (code={e.code}, reason={e.reason!r}), reconnecting in {self.reconnect_delay}s...")
-                self.reconnect_attempts += 1
-                await asyncio.sleep(self.reconnect_delay)
-                self.connection_id = None
-
-            except asyncio.TimeoutError:
-                _LOGGER.warning(f"Connection timeout, reconnecting in {self.reconnect_delay}s...")
-                self.reconnect_attempts += 1
-                await asyncio.sleep(self.reconnect_delay)
-                self.connection_id = None
+                except asyncio.TimeoutError:
+                    delay = self._on_disconnected()
+                    _LOGGER.warning(f"Connection timeout, reconnecting in {delay:.1f}s...")
+                    self.reconnect_attempts += 1
+                    await asyncio.sleep(delay)
 
-            except asyncio.CancelledError:
-                _LOGGER.info("Client task cancelled")
-                self.running = False
-                break
+                except asyncio.CancelledError:
+                    _LOGGER.info("Client task cancelled")
+                    self.running = False
+                    break
 
-            except Exception as e:
-                _LOGGER.error(f"Error: {e}")
-                self.reconnect_attempts += 1
-                await asyncio.sleep(self.reconnect_delay)
-                self.connection_id = None
+                except Exception as e:
+                    _LOGGER.error(f"Error: {e}")
+                    self.reconnect_attempts += 1
+                    self.connection_id = None
+                    self.scheduler.record_failure(FAILURE_NETWORK)
+                    await asyncio.sleep(self.scheduler.next_delay())
+        finally:
+            # Also on cancellation mid-sleep or a failed initial login: a
+            # client left in the hub would keep its device claims
+            self.running = False
+            self._cleanup_pending_invocations()
+            self.hub.detach(self)
 
-        if self.websocket:
-            await self.websocket.close()
+            if self.websocket:
+                await self.websocket.close()
+            await self.close()
 
-        _LOGGER.info("Client stopped")
+            _LOGGER.info("Client stopped")
 
     def stop(self):
         """Stop the client."""
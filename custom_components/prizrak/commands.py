@@ -0,0 +1,162 @@
+"""Per-device command queue for the Prizrak client."""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CommandSupersededError(Exception):
+    """A queued command was replaced by a newer, contradictory one."""
+
+
+class _QueuedCommand:
+    """A command waiting for (or being sent by) a device worker."""
+
+    __slots__ = ("command", "timeout", "future", "superseded")
+
+    def __init__(self, command: str, timeout: float, future: asyncio.Future):
+        """Initialize the queued command."""
+        self.command = command
+        self.timeout = timeout
+        self.future = future
+        # Replaced commands whose callers are failed once this one is sent
+        self.superseded: List["_QueuedCommand"] = []
+
+
+class _DeviceQueue:
+    """Commands of one device: the one in flight plus those waiting."""
+
+    __slots__ = ("in_flight", "waiting", "worker")
+
+    def __init__(self):
+        """Initialize the device queue."""
+        self.in_flight: Optional[_QueuedCommand] = None
+        self.waiting: List[_QueuedCommand] = []
+        self.worker: Optional[asyncio.Task] = None
+
+
+class CommandQueue:
+    """Serialize commands per device, coalescing duplicates.
+
+    - Commands for one device are sent one at a time, in order.
+    - Submitting a command that is already in flight or waiting returns the
+      result of that same invocation instead of sending it again.
+    - A waiting command is replaced in place when a newer command of the
+      same group arrives (GuardOn then GuardOff); its callers get
+      CommandSupersededError when the replacement is sent. If the group
+      switches back first (GuardOn, GuardOff, GuardOn), they share the
+      result of the command that is sent instead. A command already sent
+      cannot be recalled, so the newer one waits for it.
+    - Different devices are served by independent workers.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[int, str, float], Awaitable[bool]],
+        command_groups: Optional[Mapping[str, str]] = None,
+    ):
+        """Initialize the queue.
+
+        Args:
+            send: Coroutine sending one command, e.g. PrizrakClient.send_command
+            command_groups: Command -> group name; commands sharing a group
+                replace each other while waiting
+        """
+        self._send = send
+        self._groups = command_groups or {}
+        self._devices: Dict[int, _DeviceQueue] = {}
+
+    async def submit(self, device_id: int, command: str, timeout: float = 10.0) -> bool:
+        """Queue a command and wait for its result.
+
+        Returns:
+            True if the server confirmed the command, False otherwise
+
+        Raises:
+            CommandSupersededError: A newer command replaced this one
+        """
+        queue = self._devices.get(device_id)
+        if queue is None:
+            queue = self._devices[device_id] = _DeviceQueue()
+
+        entry = self._enqueue(device_id, queue, command, timeout)
+        if queue.worker is None:
+            queue.worker = asyncio.create_task(self._run_device(device_id, queue))
+
+        # Shielded: one caller giving up must not cancel a shared result
+        return await asyncio.shield(entry.future)
+
+    def pending(self, device_id: int) -> int:
+        """Return the number of commands in flight or waiting for a device."""
+        queue = self._devices.get(device_id)
+        if queue is None:
+            return 0
+        return len(queue.waiting) + (queue.in_flight is not None)
+
+    def _enqueue(self, device_id: int, queue: _DeviceQueue, command: str, timeout: float) -> _QueuedCommand:
+        """Add a command to a device queue, coalescing where possible."""
+        if queue.in_flight and queue.in_flight.command == command and not queue.waiting:
+            _LOGGER.debug(f"Command {command} already in flight for device {device_id}, sharing result")
+            return queue.in_flight
+
+        group = self._groups.get(command)
+        for index, waiting in enumerate(queue.waiting):
+            if waiting.command == command:
+                _LOGGER.debug(f"Command {command} already queued for device {device_id}, sharing result")
+                return waiting
+            if group is not None and self._groups.get(waiting.command) == group:
+                _LOGGER.info(f"Command {waiting.command} for device {device_id} superseded by {command}")
+                replaced = [waiting, *waiting.superseded]
+                # Switched back to an earlier command: its callers get this result
+                revived = next((old for old in replaced if old.command == command), None)
+                future = revived.future if revived else asyncio.get_running_loop().create_future()
+                entry = _QueuedCommand(command, timeout, future)
+                entry.superseded = [old for old in replaced if old is not revived]
+                queue.waiting[index] = entry
+                return entry
+
+        entry = _QueuedCommand(command, timeout, asyncio.get_running_loop().create_future())
+        queue.waiting.append(entry)
+        return entry
+
+    async def _run_device(self, device_id: int, queue: _DeviceQueue):
+        """Send queued commands for one device until its queue is empty."""
+        try:
+            while queue.waiting:
+                entry = queue.in_flight = queue.waiting.pop(0)
+                for old in entry.superseded:
+                    if not old.future.done():
+                        error = CommandSupersededError(f"{old.command} superseded by {entry.command}")
+                        old.future.set_exception(error)
+                        # Mark retrieved in case no caller is awaiting it any more
+                        old.future.exception()
+                entry.superseded = []
+                try:
+                    result = await self._send(device_id, entry.command, entry.timeout)
+                except Exception as e:
+                    _LOGGER.error(f"Command {entry.command} for device {device_id} failed: {e}")
+                    result = False
+                # Left set on cancellation, for the cleanup below
+                queue.in_flight = None
+                if not entry.future.done():
+                    entry.future.set_result(result)
+        finally:
+            queue.worker = None
+            # Anything in flight or left after a cancellation must not hang its callers
+            entries = queue.waiting
+            if queue.in_flight is not None:
+                entries = [queue.in_flight, *entries]
+                queue.in_flight = None
+            for entry in entries:
+                for old in (entry, *entry.superseded):
+                    if not old.future.done():
+                        old.future.cancel()
+            queue.waiting.clear()
+            self._devices.pop(device_id, None)
+
+    def cancel(self):
+        """Cancel all device workers (on unload); their callers get CancelledError."""
+        for queue in list(self._devices.values()):
+            if queue.worker is not None:
+                queue.worker.cancel()
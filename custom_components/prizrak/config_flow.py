@@ -7,12 +7,22 @@ from typing import Any
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
-
-from .const import DOMAIN, CONF_EMAIL, CONF_PASSWORD
-from .client import PrizrakClient
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import (
+    CONF_EMAIL,
+    CONF_PASSWORD,
+    CONF_STATISTICS_MODE,
+    CONF_TRIP_IDLE_TIMEOUT,
+    CONF_USE_MESSAGEPACK,
+    DEFAULT_TRIP_IDLE_TIMEOUT,
+    DOMAIN,
+)
+from .client import MESSAGEPACK_AVAILABLE, PrizrakClient
+from .storage import async_get_auth_cache
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,11 +39,17 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
 
     Data has the keys from STEP_USER_DATA_SCHEMA with values provided by the user.
     """
-    # Test authentication
+    # Test authentication, seeding the client with any cached app version
+    auth_cache = await async_get_auth_cache(hass)
+    cached = await auth_cache.async_get(data[CONF_EMAIL])
+    cached.pop("auth_token", None)  # Always verify the entered password
+
     client = PrizrakClient(
         data[CONF_EMAIL],
         data[CONF_PASSWORD],
-        lambda device_id, state: None  # Dummy callback for validation
+        lambda device_id, state, changed: None,  # Dummy callback for validation
+        session=async_get_clientsession(hass),
+        auth_cache=cached
     )
 
     # authenticate() is now async, so we can call it directly
@@ -42,6 +58,9 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
     if not auth_result:
         raise InvalidAuth
 
+    # Keep the fresh token so the first setup does not log in again
+    auth_cache.async_set(data[CONF_EMAIL], client.get_auth_cache())
+
     # Return info that you want to store in the config entry.
     return {"title": data[CONF_EMAIL]}
 
@@ -77,6 +96,40 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
         )
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> OptionsFlowHandler:
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle Prizrak options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        schema: dict[Any, Any] = {}
+        if MESSAGEPACK_AVAILABLE:
+            # msgpack is not a requirement: offered only where it is installed
+            schema[vol.Optional(CONF_USE_MESSAGEPACK, default=options.get(CONF_USE_MESSAGEPACK, False))] = bool
+        schema[
+            vol.Optional(CONF_TRIP_IDLE_TIMEOUT, default=options.get(CONF_TRIP_IDLE_TIMEOUT, DEFAULT_TRIP_IDLE_TIMEOUT))
+        ] = vol.All(vol.Coerce(int), vol.Range(min=1, max=120))
+        schema[vol.Optional(CONF_STATISTICS_MODE, default=options.get(CONF_STATISTICS_MODE, False))] = bool
+        return self.async_show_form(step_id="init", data_schema=vol.Schema(schema))
+
 
 class CannotConnect(HomeAssistantError):
     """Error to indicate we cannot connect."""
@@ -1,10 +1,13 @@
 """Constants for the Prizrak Monitoring integration."""
 from homeassistant.components.binary_sensor import BinarySensorDeviceClass
-from homeassistant.components.sensor import SensorDeviceClass
+from homeassistant.components.sensor import SensorDeviceClass, SensorStateClass
 
 DOMAIN = "prizrak"
 CONF_EMAIL = "email"
 CONF_PASSWORD = "password"
+CONF_USE_MESSAGEPACK = "use_messagepack"
+CONF_TRIP_IDLE_TIMEOUT = "trip_idle_timeout"
+CONF_STATISTICS_MODE = "statistics_mode"
 
 PLATFORMS = ["sensor", "binary_sensor", "button", "device_tracker"]
 
@@ -50,28 +53,112 @@ SENSOR_TYPES = {
     "wheel_heating": ("Wheel Heating", None, None, "mdi:steering", "wheel_heating_state"),
 }
 
-# Binary sensor definitions: (name, device_class, state_key)
+# Significant change per sensor: a new value is only written when it differs
+# from the last written one by at least this much (in the sensor's unit).
+# Changes to or from zero are always written. Sensors not listed here
+# (discrete states, counters, timestamps) are written on every change.
+SENSOR_DEADBANDS = {
+    "latitude": 0.0001,  # ~10 m
+    "longitude": 0.0001,
+    "gnss_speed": 2.0,
+    "altitude": 5.0,
+    "azimuth": 10.0,
+    "battery_voltage": 0.1,
+    "fuel_level": 1.0,
+    "temperature": 1.0,
+    "outside_temperature": 1.0,
+    "engine_temperature": 1.0,
+    "speed": 2.0,
+    "rpm": 100.0,
+    "gsm_level": 5.0,
+}
+
+# Sensors with long-term statistics (unlisted ones: coordinates, azimuth,
+# texts and timestamps have none)
+SENSOR_STATE_CLASSES = {
+    "gnss_speed": SensorStateClass.MEASUREMENT,
+    "altitude": SensorStateClass.MEASUREMENT,
+    "satellites": SensorStateClass.MEASUREMENT,
+    "battery_voltage": SensorStateClass.MEASUREMENT,
+    "fuel_level": SensorStateClass.MEASUREMENT,
+    "temperature": SensorStateClass.MEASUREMENT,
+    "outside_temperature": SensorStateClass.MEASUREMENT,
+    "engine_temperature": SensorStateClass.MEASUREMENT,
+    "speed": SensorStateClass.MEASUREMENT,
+    "rpm": SensorStateClass.MEASUREMENT,
+    "odometer": SensorStateClass.TOTAL_INCREASING,
+    "gsm_level": SensorStateClass.MEASUREMENT,
+}
+
+# Statistics mode: these sensors are aggregated in memory (mean/min/max per
+# 5 min and per hour) and imported hourly as external statistics
+# "prizrak:<device_id>_<sensor_key>"; their entities then have no state
+# class, so their raw states can be excluded from the recorder
+STATISTICS_SENSORS = frozenset(SENSOR_STATE_CLASSES)
+STATISTICS_SHORT_PERIOD = 300  # seconds
+STATISTICS_LONG_PERIOD = 3600  # seconds, the period of imported statistics
+
+# Device tracker: minimum movement (meters) before a new position is written
+TRACKER_MIN_DISTANCE = 20.0
+
+# In-memory GPS track per device (prizrak.export_track)
+TRACK_TOLERANCE = 10.0  # meters a simplified track may deviate from the fixes
+TRACK_MAX_POINTS = 1000  # kept points per device before compaction
+
+# Binary sensor on/off semantics:
+#   (ON_WHEN_EQUALS, value)   - on when the state equals value
+#   (ON_UNLESS_IN, values)    - on unless the state is one of values
+ON_WHEN_EQUALS = "equals"
+ON_UNLESS_IN = "unless_in"
+
+ON_WHEN_OPEN = (ON_WHEN_EQUALS, "Open")
+UNKNOWN_STATES = frozenset({"Unknown", None, ""})
+IGNITION_OFF_STATES = UNKNOWN_STATES | {"EngineOffNoKey", "EngineOff"}
+
+# Binary sensor definitions: (name, device_class, state_key, on_when)
 BINARY_SENSOR_TYPES = {
     # Doors & Locks
-    "driver_door": ("Driver Door", BinarySensorDeviceClass.DOOR, "driver_door"),
-    "front_pass_door": ("Passenger Door", BinarySensorDeviceClass.DOOR, "front_pass_door"),
-    "rear_left_door": ("Rear Left Door", BinarySensorDeviceClass.DOOR, "rear_left_door"),
-    "rear_right_door": ("Rear Right Door", BinarySensorDeviceClass.DOOR, "rear_right_door"),
-    "trunk": ("Trunk", BinarySensorDeviceClass.DOOR, "trunk"),
-    "hood": ("Hood", BinarySensorDeviceClass.DOOR, "hood"),
-    "central_lock": ("Central Lock", BinarySensorDeviceClass.LOCK, "central_lock"),
+    "driver_door": ("Driver Door", BinarySensorDeviceClass.DOOR, "driver_door", ON_WHEN_OPEN),
+    "front_pass_door": ("Passenger Door", BinarySensorDeviceClass.DOOR, "front_pass_door", ON_WHEN_OPEN),
+    "rear_left_door": ("Rear Left Door", BinarySensorDeviceClass.DOOR, "rear_left_door", ON_WHEN_OPEN),
+    "rear_right_door": ("Rear Right Door", BinarySensorDeviceClass.DOOR, "rear_right_door", ON_WHEN_OPEN),
+    "trunk": ("Trunk", BinarySensorDeviceClass.DOOR, "trunk", ON_WHEN_OPEN),
+    "hood": ("Hood", BinarySensorDeviceClass.DOOR, "hood", ON_WHEN_OPEN),
+    "central_lock": ("Central Lock", BinarySensorDeviceClass.LOCK, "central_lock", ON_WHEN_OPEN),
 
     # Security & Safety
-    "connection": ("Connection", BinarySensorDeviceClass.CONNECTIVITY, "connection_state"),
-    "guard": ("Guard", None, "guard"),
-    "alarm": ("Alarm", BinarySensorDeviceClass.SAFETY, "alarm"),
+    "connection": ("Connection", BinarySensorDeviceClass.CONNECTIVITY, "connection_state", (ON_WHEN_EQUALS, "Connected")),
+    "guard": ("Guard", None, "guard", (ON_UNLESS_IN, UNKNOWN_STATES | {"SafeGuardOff"})),
+    "alarm": ("Alarm", BinarySensorDeviceClass.SAFETY, "alarm", (ON_UNLESS_IN, UNKNOWN_STATES | {"Off"})),
 
     # Engine & Systems
-    "ignition": ("Ignition", BinarySensorDeviceClass.RUNNING, "ignition_switch"),
-    "parking_brake": ("Parking Brake", BinarySensorDeviceClass.PROBLEM, "parking_brake"),
+    "ignition": ("Ignition", BinarySensorDeviceClass.RUNNING, "ignition_switch", (ON_UNLESS_IN, IGNITION_OFF_STATES)),
+    "parking_brake": ("Parking Brake", BinarySensorDeviceClass.PROBLEM, "parking_brake", (ON_WHEN_EQUALS, "On")),
 
     # GPS
-    "gps": ("GPS", None, "geo.gps_state"),
+    "gps": ("GPS", None, "geo.gps_state", (ON_WHEN_EQUALS, "Actual")),
+}
+
+# Trip detection: a trip ends after this long without ignition or movement
+DEFAULT_TRIP_IDLE_TIMEOUT = 5  # minutes
+TRIP_MOVING_SPEED = 3.0  # km/h from which the car counts as moving
+EVENT_TRIP_ENDED = f"{DOMAIN}_trip_ended"
+
+# Trip sensor definitions: (name, unit, device_class, icon)
+# Values are of the trip in progress, or of the last one when parked
+TRIP_SENSOR_TYPES = {
+    "trip_distance": ("Trip Distance", "km", SensorDeviceClass.DISTANCE, "mdi:map-marker-distance"),
+    "trip_duration": ("Trip Duration", "min", SensorDeviceClass.DURATION, "mdi:timer-outline"),
+    "trip_max_speed": ("Trip Max Speed", "km/h", SensorDeviceClass.SPEED, "mdi:speedometer"),
+    "trip_idle_time": ("Trip Idle Time", "min", SensorDeviceClass.DURATION, "mdi:engine-outline"),
+}
+
+# Derived metric sensor definitions: (name, unit, device_class, icon)
+# Computed incrementally by the coordinator (see metrics.py)
+METRIC_SENSOR_TYPES = {
+    "fuel_consumption": ("Fuel Consumption", "L/100km", None, "mdi:gas-station-outline"),
+    "battery_drain": ("Battery Drain Rate", "mV/h", None, "mdi:car-battery"),
+    "idle_ratio": ("Engine Idle Ratio", "%", None, "mdi:engine-outline"),
 }
 
 # Button definitions: (name, command, icon)
@@ -81,3 +168,12 @@ BUTTON_TYPES = {
     "autolaunch_on": ("Autolaunch On", "AutolaunchOn", "mdi:engine"),
     "autolaunch_off": ("Autolaunch Off", "AutolaunchOff", "mdi:engine-off"),
 }
+
+# Commands that contradict each other: a queued command is replaced by a
+# newer one from the same group instead of both being sent
+COMMAND_GROUPS = {
+    "GuardOn": "guard",
+    "GuardOff": "guard",
+    "AutolaunchOn": "autolaunch",
+    "AutolaunchOff": "autolaunch",
+}
@@ -3,19 +3,91 @@ from __future__ import annotations
 
 import asyncio
 import logging
-import time
+import math
 from datetime import datetime
+from collections.abc import Iterable
 from typing import Any
 
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.util import dt as dt_util
 
+from .aggregates import SeriesAggregator
 from .client import PrizrakClient
-from .const import DOMAIN
+from .commands import CommandQueue
+from .const import (
+    COMMAND_GROUPS,
+    DEFAULT_TRIP_IDLE_TIMEOUT,
+    DOMAIN,
+    EVENT_TRIP_ENDED,
+    IGNITION_OFF_STATES,
+    SENSOR_TYPES,
+    STATISTICS_LONG_PERIOD,
+    STATISTICS_SENSORS,
+    STATISTICS_SHORT_PERIOD,
+    TRACK_MAX_POINTS,
+    TRACK_TOLERANCE,
+    TRIP_MOVING_SPEED,
+    UNKNOWN_STATES,
+)
+from .metrics import DeviceMetrics
+from .state import DeviceRecord, compile_state_accessor
+from .storage import PrizrakDeviceCache
+from .track import TrackBuffer
+from .trips import Trip, TripDetector
 
 _LOGGER = logging.getLogger(__name__)
 
+# Top-level state keys the trip detector reads
+TRIP_STATE_KEYS = frozenset({"ignition_switch", "speed", "route", "geo", "geo_ext"})
+# Top-level state keys the derived metrics read
+METRIC_STATE_KEYS = frozenset(
+    {"ignition_switch", "speed", "geo_ext", "rpm", "route", "fuel_level", "accum_voltage"}
+)
+
+# (sensor key, top-level state key, accessor) of the aggregated sensors
+STATISTIC_SOURCES = tuple(
+    (sensor_key, state_key.split(".")[0], compile_state_accessor(state_key))
+    for sensor_key, (_, _, _, _, state_key) in SENSOR_TYPES.items()
+    if sensor_key in STATISTICS_SENSORS
+)
+
+
+def _number(value: Any) -> float | None:
+    """Return a decoded state value as float (None if not a number)."""
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def _ignition(state: DeviceRecord) -> bool | None:
+    """Return True if the ignition is on (None = unknown)."""
+    ignition_switch = state.ignition_switch
+    if ignition_switch in UNKNOWN_STATES:
+        return None
+    return ignition_switch not in IGNITION_OFF_STATES
+
+
+def _speed(state: DeviceRecord) -> float | None:
+    """Return the speed in km/h, from GNSS if the CAN speed is missing."""
+    speed = state.speed
+    if not isinstance(speed, (int, float)) and state.geo_ext is not None:
+        speed = state.geo_ext.gnss_speed
+    return _number(speed)
+
+
+def _actual_fix(state: DeviceRecord) -> tuple[float, float] | None:
+    """Return (latitude, longitude) if the device has an actual GPS fix."""
+    geo = state.geo
+    # Other GPS states repeat a stale position
+    if geo is None or geo.gps_state not in (None, "Actual"):
+        return None
+    lat, lon = geo.lat, geo.lon
+    if (
+        isinstance(lat, (int, float)) and -90 <= lat <= 90
+        and isinstance(lon, (int, float)) and -180 <= lon <= 180
+    ):
+        return float(lat), float(lon)
+    return None
+
 
 class PrizrakDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching Prizrak data."""
@@ -29,92 +101,457 @@ class PrizrakDataUpdateCoordinator(DataUpdateCoordinator):
             # No update_interval - updates come via WebSocket
         )
         self.client = client
-        self.devices: dict[int, dict[str, Any]] = {}
+        # The client's typed records, shared (decoded once per EventObject)
+        self.devices: dict[int, DeviceRecord] = {}
+        # Bumped on every change of a device's state (entity memoization key)
+        self.device_versions: dict[int, int] = {}
+
+        # Simplified GPS track per device, fed from the live stream
+        self.tracks: dict[int, TrackBuffer] = {}
+
+        # Trip detection per device; trips also end on a timer once parked
+        self.trip_idle_timeout: float = DEFAULT_TRIP_IDLE_TIMEOUT * 60  # seconds
+        self.trips: dict[int, TripDetector] = {}
+        self._trip_handles: dict[int, asyncio.TimerHandle] = {}
+
+        # Fuel consumption, battery drain and idle ratio per device
+        self.metrics: dict[int, DeviceMetrics] = {}
+
+        # Statistics mode: mean/min/max per device and sensor, imported
+        # into the recorder as external statistics once an hour closes
+        self.statistics_mode = False
+        self.statistics: dict[int, dict[str, SeriesAggregator]] = {}
+        self._statistics_handle: asyncio.TimerHandle | None = None
+
+        # Commands are serialized per device and coalesced
+        self.commands = CommandQueue(self._async_send_command, COMMAND_GROUPS)
+
+        # Per-device debounce: the first event of a burst is shown at once,
+        # the rest are folded into one flush when the window closes
+        self.update_window: float = 2.0  # seconds
+        self._flush_handles: dict[int, asyncio.TimerHandle] = {}
+
+        # Entities listen to their own device only (one shard per device),
+        # indexed by the state keys they read; key None = any change
+        self._device_listeners: dict[int, dict[str | None, list[CALLBACK_TYPE]]] = {}
+
+        # Dotted paths (e.g. "geo.lat") changed by the last notified update
+        self.device_changes: dict[int, set[str]] = {}
+        self._pending_changes: dict[int, set[str]] = {}
+        # Devices whose entities all need a refresh (first data)
+        self._pending_full: set[int] = set()
+
+        # Warm start: devices restored from disk until the live stream catches up
+        self.device_cache: PrizrakDeviceCache | None = None
+        self.stale_devices: set[int] = set()
+        self.restored_device_ids: set[int] | None = None
+        self.reload_callback: Any | None = None
+
+    def restore_snapshot(
+        self,
+        devices: list[dict[str, Any]],
+        device_states: dict[int, dict[str, Any]],
+    ) -> None:
+        """Seed client and coordinator from a persisted snapshot.
+
+        Restored devices are marked stale until their first live EventObject.
+        Their last_update keeps the snapshot time, so the UI shows its age.
+        """
+        self.client.devices = devices
+        for device_id, state in device_states.items():
+            record = DeviceRecord(state)
+            self.client.device_states[device_id] = record
+            self.devices[device_id] = record
+            self.device_versions[device_id] = self.device_versions.get(device_id, 0) + 1
+
+        self.restored_device_ids = {device["device_id"] for device in devices}
+        self.stale_devices = set(self.restored_device_ids)
+        _LOGGER.info(f"Restored {len(devices)} device(s) from snapshot (stale until live data arrives)")
 
-        # Throttling for frontend updates to prevent browser memory issues
-        # Data is always up-to-date on HA server, but browser UI updates are throttled
-        self.last_frontend_update: float = 0.0
-        self.frontend_update_interval: float = 30.0  # seconds
-        self.throttling_enabled: bool = True
-        self.throttling_disable_task: Any | None = None
+    def is_stale(self, device_id: int) -> bool:
+        """Return True if the device only has restored, not live, data."""
+        return device_id in self.stale_devices
 
     @callback
-    def handle_device_update(self, device_id: int, device_state: dict[str, Any]) -> None:
+    def handle_devices_update(self, devices: list[dict[str, Any]]) -> None:
+        """Handle a fresh device catalog from GetDevices.
+
+        Saves the catalog and, if platforms were set up from a snapshot with a
+        different set of devices, asks for a reload so entities match.
+        """
+        if self.device_cache:
+            self.device_cache.async_schedule_save(devices, self.devices)
+
+        if self.restored_device_ids is None:
+            return
+
+        live_device_ids = {device["device_id"] for device in devices}
+        changed = live_device_ids != self.restored_device_ids
+        self.restored_device_ids = None
+        if changed:
+            _LOGGER.info("Device list changed since snapshot, reloading entities")
+            self.hass.async_create_task(self._async_save_and_reload())
+
+    async def _async_save_and_reload(self) -> None:
+        """Persist the new catalog, then reload so entities match it."""
+        if self.device_cache:
+            await self.device_cache.async_flush()
+        if self.reload_callback:
+            self.reload_callback()
+
+    @callback
+    def handle_device_update(
+        self,
+        device_id: int,
+        device_state: dict[str, Any],
+        changed: set[str] | None = None,
+    ) -> None:
         """Handle device state update from WebSocket.
 
         Args:
             device_id: Device ID
             device_state: New device state (partial update)
+            changed: Dotted paths the update changed (None = unknown, all)
         """
-        # Use client.device_states which accumulates ALL fields
-        # instead of coordinator.devices which only gets partial updates
-        full_device_state = self.client.device_states.get(device_id, {})
+        # Use client.device_states which accumulates ALL fields,
+        # already decoded (numbers, interned enums, datetimes)
+        state = self.client.device_states.get(device_id)
+
+        if state is not None:
+            if self.devices.get(device_id) is not state or changed is None:
+                # New device: availability of every entity changes too
+                self._pending_full.add(device_id)
+                self.devices[device_id] = state
+                changed = set(state) if changed is None else changed
 
-        if full_device_state:
             # Add timestamp of last update (as datetime object for TIMESTAMP device_class)
-            full_device_state["last_update"] = dt_util.utcnow()
-
-            # Convert timestamp strings to datetime objects
-            time_key = "last_device_exchange_time"
-            if time_key in full_device_state and isinstance(full_device_state[time_key], str):
-                try:
-                    full_device_state[time_key] = dt_util.parse_datetime(full_device_state[time_key])
-                except (ValueError, TypeError):
-                    _LOGGER.warning(f"Could not parse {time_key}: {full_device_state[time_key]}")
-                    full_device_state[time_key] = None
-
-            # ALWAYS update coordinator's cache (server-side data)
-            # This ensures automations, scripts, and history have real-time data
-            self.devices[device_id] = full_device_state
-
-            # Throttle frontend updates to prevent browser memory issues
-            # Only notify frontend (browser UI) if enough time has passed
-            current_time = time.time()
-            time_since_last_update = current_time - self.last_frontend_update
-
-            # Check if throttling is enabled and enough time has passed
-            should_update = not self.throttling_enabled or time_since_last_update >= self.frontend_update_interval
-
-            if should_update:
-                # Notify all listeners (entities) about the update → triggers browser UI redraw
-                self.async_set_updated_data(self.devices)
-                self.last_frontend_update = current_time
-                throttle_status = "disabled" if not self.throttling_enabled else f"throttled: {time_since_last_update:.1f}s since last"
-                _LOGGER.debug(f"Frontend update sent ({throttle_status})")
-            else:
-                # Data updated on server, but browser UI not notified yet (throttled)
-                _LOGGER.debug(
-                    f"Frontend update skipped (throttled: {time_since_last_update:.1f}s < {self.frontend_update_interval}s)"
-                )
+            state.last_update = dt_util.utcnow()
+            self.device_versions[device_id] = self.device_versions.get(device_id, 0) + 1
+
+            if "geo" in changed:
+                self._record_track_point(device_id, state)
+            if self.statistics_mode:
+                self._record_statistics(device_id, state, changed)
+
+            # Changes since the entities were last notified
+            pending = self._pending_changes.setdefault(device_id, set())
+            pending.update(changed)
+            pending.add("last_update")
+            if not TRIP_STATE_KEYS.isdisjoint(changed) and self._update_trip(device_id, state):
+                pending.add("trip")
+            if not METRIC_STATE_KEYS.isdisjoint(changed) and self._update_metrics(device_id, state):
+                pending.add("metrics")
+            if device_id in self.stale_devices:
+                # First live data: every entity drops its "restored" mark
+                self.stale_devices.discard(device_id)
+                self._pending_full.add(device_id)
+
+            # Write-behind snapshot for the next warm start
+            if self.device_cache:
+                self.device_cache.async_schedule_save(self.client.devices, self.devices)
+
+            # Entities filter insignificant changes themselves (see SENSOR_DEADBANDS)
+            self._async_schedule_notify(device_id)
         else:
             _LOGGER.warning(f"Device {device_id} not found in client.device_states")
 
-    def disable_throttling_temporarily(self, duration: float = 30.0) -> None:
-        """Temporarily disable frontend update throttling.
+    def _record_track_point(self, device_id: int, state: DeviceRecord) -> None:
+        """Add the device's current GPS fix to its track."""
+        fix = _actual_fix(state)
+        if fix is None:
+            return
+
+        geo_ext = state.geo_ext
+        speed = geo_ext.gnss_speed if geo_ext is not None else None
+        if speed is None:
+            speed = state.speed
+        azimuth = geo_ext.gnss_azimuth if geo_ext is not None else None
+
+        track = self.tracks.get(device_id)
+        if track is None:
+            track = self.tracks[device_id] = TrackBuffer(TRACK_TOLERANCE, TRACK_MAX_POINTS)
+        track.append(
+            state.last_update.timestamp(),
+            *fix,
+            float(speed) if isinstance(speed, (int, float)) else math.nan,
+            float(azimuth) if isinstance(azimuth, (int, float)) else math.nan,
+        )
+
+    def _record_statistics(self, device_id: int, state: DeviceRecord, changed: set[str]) -> None:
+        """Add the changed values of the aggregated sensors."""
+        timestamp = state.last_update.timestamp()
+        series = self.statistics.setdefault(device_id, {})
+        for sensor_key, state_key, accessor in STATISTIC_SOURCES:
+            if state_key not in changed:
+                continue
+            value = _number(accessor(state))
+            if value is None:
+                continue
+            aggregator = series.get(sensor_key)
+            if aggregator is None:
+                aggregator = series[sensor_key] = SeriesAggregator(STATISTICS_SHORT_PERIOD, STATISTICS_LONG_PERIOD)
+            aggregator.add(timestamp, value)
+        # Heard from the device: its unchanged series keep their value
+        for aggregator in series.values():
+            aggregator.touch(timestamp)
+
+    @callback
+    def async_start_statistics(self) -> None:
+        """Close the aggregate buckets at every short period boundary."""
+        now = dt_util.utcnow().timestamp()
+        # A second late, so that events stamped at the boundary are in
+        delay = STATISTICS_SHORT_PERIOD - now % STATISTICS_SHORT_PERIOD + 1
+        self._statistics_handle = self.hass.loop.call_later(delay, self._async_statistics_tick)
+
+    @callback
+    def _async_statistics_tick(self) -> None:
+        """Flush the aggregates and re-arm the timer."""
+        self.async_flush_statistics()
+        self.async_start_statistics()
+
+    @callback
+    def async_flush_statistics(self) -> None:
+        """Close finished buckets and import the closed hours.
+
+        Each series gets one recorder job with all its closed hours, so an
+        import after a recorder outage is a single batch too. Without the
+        recorder, closed hours wait in their (bounded) queues.
+        """
+        now = dt_util.utcnow().timestamp()
+        event_times = self.client.device_event_times
+        for device_id, series in self.statistics.items():
+            # Unchanged events never reach the coordinator, but keep the
+            # values of a device that is still reporting
+            seen = event_times.get(device_id)
+            for aggregator in series.values():
+                if seen is not None:
+                    aggregator.touch(seen)
+                aggregator.advance(now)
+
+        if "recorder" not in self.hass.config.components:
+            return
+        # Imported here: only statistics mode needs the recorder
+        from homeassistant.components.recorder.statistics import async_add_external_statistics
+
+        imported = 0
+        for device_id, series in self.statistics.items():
+            device_name = self._device_name(device_id)
+            for sensor_key, aggregator in series.items():
+                rows = aggregator.pop_closed()
+                if not rows:
+                    continue
+                name, unit, *_ = SENSOR_TYPES[sensor_key]
+                metadata = {
+                    "has_mean": True,
+                    "has_sum": False,
+                    "name": f"{device_name} {name}",
+                    "source": DOMAIN,
+                    "statistic_id": f"{DOMAIN}:{device_id}_{sensor_key}",
+                    "unit_of_measurement": unit,
+                }
+                async_add_external_statistics(
+                    self.hass,
+                    metadata,
+                    [
+                        {"start": dt_util.utc_from_timestamp(start), "mean": mean, "min": low, "max": high}
+                        for start, mean, low, high in rows
+                    ],
+                )
+                imported += len(rows)
+        if imported:
+            _LOGGER.debug(f"Imported {imported} hourly statistics")
+
+    def _update_trip(self, device_id: int, state: DeviceRecord) -> bool:
+        """Feed the device's trip detector.
+
+        Returns:
+            True if the trip sensors of the device change
+        """
+        detector = self.trips.get(device_id)
+        if detector is None:
+            detector = self.trips[device_id] = TripDetector(self.trip_idle_timeout, TRIP_MOVING_SPEED)
+        was_open = detector.current is not None
+
+        lat, lon = _actual_fix(state) or (None, None)
+        ended = detector.update(
+            state.last_update.timestamp(),
+            _ignition(state),
+            _speed(state),
+            _number(state.route),
+            lat,
+            lon,
+        )
+        if ended is not None:
+            self._fire_trip_ended(device_id, ended)
+        self._schedule_trip_expiry(device_id, detector)
+        return was_open or ended is not None or detector.current is not None
+
+    def _update_metrics(self, device_id: int, state: DeviceRecord) -> bool:
+        """Feed the device's derived metrics.
+
+        Returns:
+            True if a metric of the device changed
+        """
+        metrics = self.metrics.get(device_id)
+        if metrics is None:
+            metrics = self.metrics[device_id] = DeviceMetrics(TRIP_MOVING_SPEED)
+        return metrics.update(
+            state.last_update.timestamp(),
+            _ignition(state),
+            _speed(state),
+            _number(state.rpm),
+            _number(state.route),
+            _number(state.fuel_level),
+            _number(state.accum_voltage),
+        )
+
+    def _schedule_trip_expiry(self, device_id: int, detector: TripDetector) -> None:
+        """(Re)arm the timer ending a parked car's trip."""
+        handle = self._trip_handles.pop(device_id, None)
+        if handle is not None:
+            handle.cancel()
+        close_at = detector.close_at
+        if close_at is not None:
+            delay = max(0.0, close_at - dt_util.utcnow().timestamp())
+            self._trip_handles[device_id] = self.hass.loop.call_later(
+                delay, self._async_trip_expired, device_id
+            )
+
+    @callback
+    def _async_trip_expired(self, device_id: int) -> None:
+        """End the trip of a car that stayed parked for the idle timeout."""
+        self._trip_handles.pop(device_id, None)
+        ended = self.trips[device_id].expire(dt_util.utcnow().timestamp())
+        if ended is not None:
+            self._fire_trip_ended(device_id, ended)
+            self._pending_changes.setdefault(device_id, set()).add("trip")
+            self._async_schedule_notify(device_id)
+
+    def _fire_trip_ended(self, device_id: int, trip: Trip) -> None:
+        """Fire prizrak_trip_ended with the trip summary."""
+        name = self._device_name(device_id)
+        summary = trip.as_dict()
+        _LOGGER.info(
+            f"Trip of device {device_id} ended: {summary['distance_km']} km in {summary['duration_min']} min"
+        )
+        self.hass.bus.async_fire(EVENT_TRIP_ENDED, {"device_id": device_id, "name": name, **summary})
+
+    def _device_name(self, device_id: int) -> str:
+        """Return the name of a device as listed by the server."""
+        name = next(
+            (device.get("name") for device in self.client.devices if device["device_id"] == device_id),
+            None,
+        )
+        return name or f"Prizrak {device_id}"
 
-        Used after sending commands (Guard, Autolaunch) to show immediate feedback.
-        Throttling is re-enabled after specified duration.
+    @callback
+    def _async_schedule_notify(self, device_id: int) -> None:
+        """Notify now, or at the end of the device's open window."""
+        if device_id in self._flush_handles:
+            # The trailing flush picks this change up
+            return
+        self._async_notify_device(device_id)
+        self._flush_handles[device_id] = self.hass.loop.call_later(
+            self.update_window, self._async_window_closed, device_id
+        )
+
+    @callback
+    def _async_window_closed(self, device_id: int) -> None:
+        """Flush changes that arrived during the window (trailing edge)."""
+        del self._flush_handles[device_id]
+        if device_id in self._pending_changes:
+            _LOGGER.debug(f"Trailing flush for device {device_id}")
+            self._async_schedule_notify(device_id)
+
+    @callback
+    def async_cancel_pending_updates(self) -> None:
+        """Cancel the debounce, trip and statistics timers (on unload)."""
+        for handle in self._flush_handles.values():
+            handle.cancel()
+        self._flush_handles.clear()
+        for handle in self._trip_handles.values():
+            handle.cancel()
+        self._trip_handles.clear()
+        if self._statistics_handle is not None:
+            self._statistics_handle.cancel()
+            self._statistics_handle = None
+
+    @callback
+    def _async_notify_device(self, device_id: int) -> None:
+        """Hand the pending changes of a device to its entities."""
+        changes = self.device_changes[device_id] = self._pending_changes.pop(device_id, set())
+        if device_id in self._pending_full:
+            self._pending_full.discard(device_id)
+            changes = None
+        self.async_update_device_listeners(device_id, changes)
+
+    @callback
+    def async_add_device_listener(
+        self,
+        device_id: int,
+        update_callback: CALLBACK_TYPE,
+        keys: Iterable[str] | None = None,
+    ) -> CALLBACK_TYPE:
+        """Listen for updates of one device; returns a function to stop.
 
         Args:
-            duration: How long to disable throttling (seconds)
+            device_id: Device to listen to
+            update_callback: Called without arguments
+            keys: State keys the listener reads (dotted, e.g. "geo.lat" or
+                "geo"). It is only called when one of them changed, or when
+                the whole device is refreshed. None = every update.
         """
-        # Cancel previous task if exists
-        if self.throttling_disable_task and not self.throttling_disable_task.done():
-            self.throttling_disable_task.cancel()
+        index = self._device_listeners.setdefault(device_id, {})
+        listen_keys = [None] if keys is None else list(dict.fromkeys(keys))
+        if not listen_keys:
+            # No keys: only called when the whole device is refreshed
+            listen_keys = [""]
+        for key in listen_keys:
+            index.setdefault(key, []).append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            for key in listen_keys:
+                listeners = index.get(key)
+                if listeners and update_callback in listeners:
+                    listeners.remove(update_callback)
+                    if not listeners:
+                        del index[key]
+            if not index:
+                self._device_listeners.pop(device_id, None)
+
+        return remove_listener
 
-        # Disable throttling
-        self.throttling_enabled = False
-        _LOGGER.info(f"Throttling disabled for {duration}s (command sent)")
+    @callback
+    def async_update_device_listeners(
+        self, device_id: int, changed: Iterable[str] | None = None
+    ) -> None:
+        """Notify the entities of one device whose keys changed.
+
+        Args:
+            device_id: Device that was updated
+            changed: Changed dotted paths (None = notify every entity)
+        """
+        index = self._device_listeners.get(device_id)
+        if not index:
+            return
+        if changed is None:
+            groups = list(index.values())
+        else:
+            groups = [index[key] for key in (None, *changed) if key in index]
 
-        # Schedule re-enable
-        async def re_enable_throttling():
-            await asyncio.sleep(duration)
-            self.throttling_enabled = True
-            _LOGGER.info("Throttling re-enabled")
+        # An entity listening to several changed keys is called once
+        callbacks: dict[CALLBACK_TYPE, None] = {}
+        for listeners in groups:
+            callbacks.update(dict.fromkeys(listeners))
+        for update_callback in callbacks:
+            update_callback()
 
-        self.throttling_disable_task = self.hass.async_create_task(re_enable_throttling())
+    async def _async_send_command(self, device_id: int, command: str, timeout: float) -> bool:
+        """Send a command through the current client (set after construction)."""
+        return await self.client.send_command(device_id, command, timeout=timeout)
 
-    async def _async_update_data(self) -> dict[int, dict[str, Any]]:
+    async def _async_update_data(self) -> dict[int, DeviceRecord]:
         """Update data via library.
 
         This is only used as a fallback. Real updates come via WebSocket callbacks.
@@ -8,13 +8,59 @@ from homeassistant.components.device_tracker import SourceType, TrackerEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util.location import distance
 
-from .const import DOMAIN
+from .const import DOMAIN, TRACKER_MIN_DISTANCE
 from .coordinator import PrizrakDataUpdateCoordinator
+from .entity import PrizrakEntity
+from .state import DeviceRecord
 
 _LOGGER = logging.getLogger(__name__)
 
+# Tracker attribute -> geo_ext field
+GEO_EXT_ATTRIBUTES = (
+    ("satellites", "gnss_sat_used"),
+    ("altitude", "gnss_height"),
+    ("gps_speed", "gnss_speed"),
+    ("azimuth", "gnss_azimuth"),
+)
+
+
+def decode_tracker_state(
+    state: DeviceRecord,
+) -> tuple[float | None, float | None, dict[str, Any]]:
+    """Return (latitude, longitude, attributes) of a device state.
+
+    Coordinates out of range are None.
+    """
+    latitude = longitude = None
+    attributes: dict[str, Any] = {}
+
+    geo = state.geo
+    if geo is not None:
+        # Decoded to numbers on arrival, only the range is checked here
+        if isinstance(geo.lat, (int, float)) and -90 <= geo.lat <= 90:
+            latitude = float(geo.lat)
+        if isinstance(geo.lon, (int, float)) and -180 <= geo.lon <= 180:
+            longitude = float(geo.lon)
+        # GPS quality info
+        if geo.gps_state is not None:
+            attributes["gps_state"] = geo.gps_state
+
+    # Satellites, altitude, GPS speed and heading
+    geo_ext = state.geo_ext
+    if geo_ext is not None:
+        for attribute, field in GEO_EXT_ATTRIBUTES:
+            value = getattr(geo_ext, field)
+            if value is not None:
+                attributes[attribute] = value
+
+    # Vehicle speed (may differ from GPS speed)
+    if state.speed is not None:
+        attributes["speed"] = state.speed
+
+    return latitude, longitude, attributes
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -43,7 +89,7 @@ async def async_setup_entry(
     async_add_entities(entities)
 
 
-class PrizrakDeviceTracker(CoordinatorEntity, TrackerEntity):
+class PrizrakDeviceTracker(PrizrakEntity, TrackerEntity):
     """Representation of a Prizrak GPS tracker."""
 
     def __init__(
@@ -58,6 +104,11 @@ class PrizrakDeviceTracker(CoordinatorEntity, TrackerEntity):
         self._device_id = device_id
         self._device_name = device_name
 
+        # Position and attributes, decoded once per device state version
+        self._state_accessor = decode_tracker_state
+        # Last written (latitude, longitude, attributes)
+        self._published: tuple[float | None, float | None, dict[str, Any]] | None = None
+
         # Entity name and ID
         self._attr_name = device_name
         self._attr_unique_id = f"prizrak_{device_id}_tracker"
@@ -73,39 +124,47 @@ class PrizrakDeviceTracker(CoordinatorEntity, TrackerEntity):
             "suggested_area": "Garage",
         }
 
+    @property
+    def state_keys(self) -> tuple[str, ...]:
+        """Return the state keys the tracker and its attributes read."""
+        return ("geo", "geo_ext", "speed")
+
     @property
     def latitude(self) -> float | None:
         """Return latitude value of the device."""
-        device_state = self.coordinator.devices.get(self._device_id, {})
-        geo = device_state.get("geo", {})
-        lat = geo.get("lat")
-
-        # Validate latitude range
-        if lat is not None:
-            try:
-                lat_float = float(lat)
-                if -90 <= lat_float <= 90:
-                    return lat_float
-            except (ValueError, TypeError):
-                pass
-        return None
+        return self._state_value()[0]
 
     @property
     def longitude(self) -> float | None:
         """Return longitude value of the device."""
-        device_state = self.coordinator.devices.get(self._device_id, {})
-        geo = device_state.get("geo", {})
-        lon = geo.get("lon")
-
-        # Validate longitude range
-        if lon is not None:
-            try:
-                lon_float = float(lon)
-                if -180 <= lon_float <= 180:
-                    return lon_float
-            except (ValueError, TypeError):
-                pass
-        return None
+        return self._state_value()[1]
+
+    def is_significant_change(self, force: bool = False) -> bool:
+        """Return True if the tracker state is new and the car moved enough.
+
+        Nothing is written while position and attributes are unchanged, or
+        while the car moves less than TRACKER_MIN_DISTANCE with the same
+        GPS state.
+        """
+        current = self._state_value()
+        published = self._published
+        if current == published and not force:
+            return False
+        latitude, longitude, attributes = current
+        if (
+            not force
+            and published is not None
+            and latitude is not None
+            and longitude is not None
+            and published[0] is not None
+            and published[1] is not None
+            and attributes.get("gps_state") == published[2].get("gps_state")
+        ):
+            moved = distance(published[0], published[1], latitude, longitude)
+            if moved is not None and moved < TRACKER_MIN_DISTANCE:
+                return False
+        self._published = current
+        return True
 
     @property
     def source_type(self) -> SourceType:
@@ -125,34 +184,4 @@ class PrizrakDeviceTracker(CoordinatorEntity, TrackerEntity):
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
         """Return additional state attributes."""
-        device_state = self.coordinator.devices.get(self._device_id, {})
-        geo = device_state.get("geo", {})
-        geo_ext = device_state.get("geo_ext", {})
-
-        attributes = {}
-
-        # GPS quality info
-        if "gps_state" in geo:
-            attributes["gps_state"] = geo["gps_state"]
-
-        # Satellite info
-        if "gnss_sat_used" in geo_ext:
-            attributes["satellites"] = geo_ext["gnss_sat_used"]
-
-        # Altitude
-        if "gnss_height" in geo_ext:
-            attributes["altitude"] = geo_ext["gnss_height"]
-
-        # Speed from GPS
-        if "gnss_speed" in geo_ext:
-            attributes["gps_speed"] = geo_ext["gnss_speed"]
-
-        # Azimuth/heading
-        if "gnss_azimuth" in geo_ext:
-            attributes["azimuth"] = geo_ext["gnss_azimuth"]
-
-        # Vehicle speed (may differ from GPS speed)
-        if "speed" in device_state:
-            attributes["speed"] = device_state["speed"]
-
-        return attributes
+        return self._with_restored_mark(self._state_value()[2])
@@ -0,0 +1,49 @@
+"""Diagnostics support for Prizrak Monitoring."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import CONF_EMAIL, CONF_PASSWORD, DOMAIN
+from .coordinator import PrizrakDataUpdateCoordinator
+
+# The entry title and unique_id are the login email too
+TO_REDACT = {CONF_EMAIL, CONF_PASSWORD, "title", "unique_id"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry, with hub-wide resource usage."""
+    coordinator: PrizrakDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    client = coordinator.client
+    hub = client.hub
+
+    # Other accounts are listed by position so their logins stay private
+    accounts = {
+        "this" if other is client else f"account_{index}": other.usage()
+        for index, other in enumerate(hub.clients, start=1)
+    }
+
+    # Statistics mode: the 5-minute aggregates of the last hour per sensor
+    statistics = {
+        device_id: {
+            sensor_key: [
+                {"start": dt_util.utc_from_timestamp(start).isoformat(), "mean": mean, "min": low, "max": high}
+                for start, mean, low, high in aggregator.history
+            ]
+            for sensor_key, aggregator in series.items()
+        }
+        for device_id, series in coordinator.statistics.items()
+    }
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "hub": hub.stats(),
+        "accounts": accounts,
+        "statistics": statistics,
+    }
@@ -0,0 +1,105 @@
+"""Base entity for Prizrak Monitoring."""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .coordinator import PrizrakDataUpdateCoordinator
+from .state import DeviceRecord, compile_state_accessor
+
+# Read by entities of a device that has no state yet
+_NO_STATE = DeviceRecord()
+
+# Attribute of entities showing restored, not yet live, data
+ATTR_RESTORED = "restored"
+
+
+class PrizrakEntity(CoordinatorEntity[PrizrakDataUpdateCoordinator]):
+    """Entity bound to one Prizrak device.
+
+    Besides the coordinator-wide listener, it listens to its own device,
+    so a state update of one car only wakes that car's entities, and of
+    those only the ones reading a changed key. Subclasses set
+    self._device_id in __init__ and override state_keys if they read
+    specific fields, and is_significant_change to skip writes of changes
+    too small to matter. Until the first live event after a warm start,
+    the entity shows restored data and carries the attribute restored: true.
+    """
+
+    _device_id: int
+    _published_available: bool | None = None
+    _published_stale: bool | None = None
+
+    # Memoized state value, valid while the device version is unchanged
+    _state_accessor: Callable[[DeviceRecord], Any] | None = None
+    _cached_version: int = -1
+    _cached_value: Any = None
+
+    @property
+    def state_keys(self) -> Iterable[str] | None:
+        """Return the state keys this entity reads (None = all)."""
+        return None
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to updates of this entity's device."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_device_listener(
+                self._device_id, self._handle_coordinator_update, self.state_keys
+            )
+        )
+
+    def _state_value(self) -> Any:
+        """Return the value of _state_accessor for the current device state.
+
+        Computed once per device state version, so the repeated property
+        reads of one state write cost a dict lookup each.
+        """
+        version = self.coordinator.device_versions.get(self._device_id, 0)
+        if version != self._cached_version:
+            state = self.coordinator.devices.get(self._device_id, _NO_STATE)
+            self._cached_value = self._state_accessor(state)
+            self._cached_version = version
+        return self._cached_value
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Mark state restored from the snapshot (no live data yet)."""
+        return self._with_restored_mark(None)
+
+    def _with_restored_mark(self, attributes: dict[str, Any] | None) -> dict[str, Any] | None:
+        """Return attributes plus restored: true while the device is stale.
+
+        Only entities reading the device state (a _state_accessor) are
+        marked; trips, metrics and buttons only know live data.
+        """
+        if self._state_accessor is None or not self.coordinator.is_stale(self._device_id):
+            return attributes
+        return {**(attributes or {}), ATTR_RESTORED: True}
+
+    def is_significant_change(self, force: bool = False) -> bool:
+        """Return True if the current state is worth writing.
+
+        Implementations remember what they return True for as the baseline
+        of the next comparison.
+
+        Args:
+            force: The state is written anyway (availability changed), only
+                the baseline is updated
+        """
+        return True
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state unless the change is insignificant."""
+        available = self.available
+        stale = self.coordinator.is_stale(self._device_id)
+        forced = available != self._published_available or stale != self._published_stale
+        if not self.is_significant_change(force=forced):
+            return
+        self._published_available = available
+        self._published_stale = stale
+        super()._handle_coordinator_update()
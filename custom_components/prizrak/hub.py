@@ -0,0 +1,158 @@
+"""Connection resources shared by every Prizrak account."""
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import aiohttp
+
+if TYPE_CHECKING:
+    from .client import PrizrakClient
+
+_LOGGER = logging.getLogger(__name__)
+
+APP_VERSION_TTL = 6 * 3600  # seconds before the version is scraped again
+
+
+class ConnectionHub:
+    """Share one HTTP session, version scrape and timer loop between clients.
+
+    - The app version is scraped once per APP_VERSION_TTL for all accounts;
+      concurrent callers wait for the same fetch.
+    - Keep-alive pings and health checks of every connected client run
+      from a single task that sleeps until the earliest due timer, instead
+      of two sleeping tasks per connection.
+    - Each device is served by one account only: the first account whose
+      catalog lists it claims it, so a car shared between accounts is
+      watched once and its EventObjects reach a single coordinator. The
+      claim is not handed over while both accounts run (the other
+      account never created the car's entities); after a restart the
+      account whose GetDevices returns first wins, which may be another.
+    """
+
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        """Initialize the hub.
+
+        Args:
+            session: HTTP session handed to every client (e.g. HA's client
+                session). If omitted, each client manages its own.
+        """
+        self.session = session
+        self.clients: List["PrizrakClient"] = []
+
+        self._app_version: Optional[Tuple[str, Optional[str]]] = None
+        self._app_version_time = 0.0
+        self._app_version_task: Optional[asyncio.Task] = None
+        self.version_fetches = 0
+
+        self._connected: Set["PrizrakClient"] = set()
+        self._timer_task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self.timer_wakeups = 0
+
+        self._device_owners: Dict[int, "PrizrakClient"] = {}
+
+    def attach(self, client: "PrizrakClient"):
+        """Register a client with the hub."""
+        if client not in self.clients:
+            self.clients.append(client)
+
+    def detach(self, client: "PrizrakClient"):
+        """Forget a client and release the devices it claimed."""
+        if client in self.clients:
+            self.clients.remove(client)
+        self.disconnected(client)
+        for device_id in [d for d, owner in self._device_owners.items() if owner is client]:
+            del self._device_owners[device_id]
+
+    async def get_app_version(
+        self, fetch: Callable[[], Awaitable[Tuple[str, Optional[str]]]]
+    ) -> Tuple[str, Optional[str]]:
+        """Return the shared (app_version, frontend_version), fetching if stale.
+
+        Args:
+            fetch: Coroutine function scraping the versions, used only when
+                no fresh value is cached and no fetch is already running
+        """
+        if self._app_version and time.monotonic() - self._app_version_time < APP_VERSION_TTL:
+            return self._app_version
+
+        if self._app_version_task is None:
+            self.version_fetches += 1
+            self._app_version_task = asyncio.ensure_future(fetch())
+        task = self._app_version_task
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            if task.done() and self._app_version_task is task:
+                self._app_version_task = None
+
+        self._app_version = result
+        self._app_version_time = time.monotonic()
+        return result
+
+    def invalidate_app_version(self, app_version: Optional[str]):
+        """Drop the shared version after the server rejected it."""
+        if self._app_version and self._app_version[0] == app_version:
+            self._app_version = None
+
+    def claim_devices(self, client: "PrizrakClient", devices: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return the devices this client should serve.
+
+        Devices already served by another attached client are left out.
+        """
+        claimed = []
+        for device in devices:
+            device_id = device.get("device_id")
+            owner = self._device_owners.get(device_id)
+            if owner is None or owner is client or owner not in self.clients:
+                self._device_owners[device_id] = client
+                claimed.append(device)
+            else:
+                _LOGGER.info(f"Device {device_id} is already served by account {owner.login}, skipping it for {client.login}")
+        return claimed
+
+    def serves(self, client: "PrizrakClient", device_id: int) -> bool:
+        """Return True unless another account owns the device."""
+        owner = self._device_owners.get(device_id)
+        return owner is None or owner is client
+
+    def connected(self, client: "PrizrakClient"):
+        """Start serving a client's keep-alive and health timers."""
+        self._connected.add(client)
+        self._wakeup.set()
+        if self._timer_task is None or self._timer_task.done():
+            self._timer_task = asyncio.ensure_future(self._run_timers())
+
+    def disconnected(self, client: "PrizrakClient"):
+        """Stop serving a client's timers."""
+        self._connected.discard(client)
+        self._wakeup.set()
+
+    async def _run_timers(self):
+        """Run due client timers, then sleep until the earliest next one."""
+        while self._connected:
+            self._wakeup.clear()
+            now = time.monotonic()
+            due = [client for client in self._connected if client.next_timer_due() <= now]
+            if due:
+                await asyncio.gather(*(client.run_timers(now) for client in due), return_exceptions=True)
+
+            if not self._connected:
+                break
+            next_due = min(client.next_timer_due() for client in self._connected)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, next_due - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+            self.timer_wakeups += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hub-wide counters."""
+        return {
+            "accounts": len(self.clients),
+            "connected": len(self._connected),
+            "version_fetches": self.version_fetches,
+            "timer_wakeups": self.timer_wakeups,
+            "claimed_devices": len(self._device_owners),
+        }
@@ -0,0 +1,274 @@
+"""Streaming derived metrics for Prizrak devices.
+
+Every estimator keeps a handful of running sums and costs O(1) per update;
+nothing reads the recorder history.
+"""
+from typing import Optional
+
+
+class EwRegression:
+    """Exponentially weighted least-squares line through (x, y) samples.
+
+    The weight of a sample halves every half_life units of x, so the fit
+    follows the recent part of the stream. Means, variance and covariance
+    are updated incrementally (West/Finch), which stays exact for large x
+    such as odometer readings or epoch hours.
+    """
+
+    __slots__ = ("half_life", "count", "weight", "mean_x", "mean_y", "var_x", "cov_xy", "first_x", "last_x")
+
+    def __init__(self, half_life: float):
+        """Initialize an empty fit (half_life in units of x)."""
+        self.half_life = half_life
+        self.reset()
+
+    def reset(self):
+        """Forget all samples."""
+        self.count = 0
+        self.weight = 0.0
+        self.mean_x = self.mean_y = 0.0
+        self.var_x = self.cov_xy = 0.0
+        self.first_x = self.last_x = 0.0
+
+    def add(self, x: float, y: float):
+        """Add a sample (x must not decrease)."""
+        if not self.count:
+            self.first_x = x
+            self.mean_x, self.mean_y = x, y
+            self.weight = 1.0
+        else:
+            decay = 0.5 ** ((x - self.last_x) / self.half_life) if x > self.last_x else 1.0
+            self.weight = self.weight * decay + 1.0
+            alpha = 1.0 / self.weight
+            dx = x - self.mean_x
+            dy = y - self.mean_y
+            self.mean_x += alpha * dx
+            self.mean_y += alpha * dy
+            self.var_x = (1.0 - alpha) * (self.var_x + alpha * dx * dx)
+            self.cov_xy = (1.0 - alpha) * (self.cov_xy + alpha * dx * dy)
+        self.count += 1
+        self.last_x = x
+
+    @property
+    def span(self) -> float:
+        """Return the x range covered since the last reset."""
+        return self.last_x - self.first_x if self.count else 0.0
+
+    @property
+    def slope(self) -> Optional[float]:
+        """Return dy/dx of the fit (None with fewer than two distinct x)."""
+        if self.count < 2 or self.var_x <= 0:
+            return None
+        return self.cov_xy / self.var_x
+
+
+class FuelConsumption:
+    """Rolling fuel consumption in L/100 km.
+
+    Fits fuel level against odometer while the odometer advances, so a
+    noisy level sensor averages out over the distance. A refuel (level
+    rising by refuel_threshold) or an odometer going back starts a new fit;
+    the last estimate is kept until the new fit covers min_distance.
+    """
+
+    __slots__ = ("fit", "min_distance", "refuel_threshold", "last_fuel", "value")
+
+    def __init__(self, half_distance: float = 100.0, min_distance: float = 30.0, refuel_threshold: float = 5.0):
+        """Initialize the estimator.
+
+        Args:
+            half_distance: Km after which a sample weighs half as much
+            min_distance: Km a fit must cover before it is reported
+            refuel_threshold: Rise in liters that counts as refueling
+        """
+        self.fit = EwRegression(half_distance)
+        self.min_distance = min_distance
+        self.refuel_threshold = refuel_threshold
+        self.last_fuel: Optional[float] = None
+        self.value: Optional[float] = None
+
+    def update(self, odometer: Optional[float], fuel: Optional[float]) -> bool:
+        """Feed the current odometer (km) and fuel level (L).
+
+        Returns:
+            True if the estimate changed
+        """
+        if odometer is None or fuel is None:
+            return False
+        fit = self.fit
+        if fit.count and (odometer < fit.last_x or fuel - self.last_fuel >= self.refuel_threshold):
+            fit.reset()
+        elif fit.count and odometer == fit.last_x:
+            # Standing: the level only sloshes
+            return False
+        fit.add(odometer, fuel)
+        self.last_fuel = fuel
+
+        slope = fit.slope
+        if slope is None or slope >= 0 or fit.span < self.min_distance:
+            return False
+        self.value = -slope * 100
+        return True
+
+
+class BatteryDrain:
+    """Slope of the battery voltage while parked, in mV/h.
+
+    The first settle_time seconds after the engine stops are skipped (the
+    voltage relaxes from charging there), then voltage is fitted against
+    time. The estimate of the last parking is kept while driving.
+    """
+
+    __slots__ = ("fit", "settle_time", "min_span", "parked_since", "value")
+
+    def __init__(self, half_life: float = 6.0, settle_time: float = 1800.0, min_span: float = 1.0):
+        """Initialize the estimator.
+
+        Args:
+            half_life: Hours after which a sample weighs half as much
+            settle_time: Seconds after parking before voltage is sampled
+            min_span: Hours a fit must cover before it is reported
+        """
+        self.fit = EwRegression(half_life)
+        self.settle_time = settle_time
+        self.min_span = min_span
+        self.parked_since: Optional[float] = None
+        self.value: Optional[float] = None
+
+    def update(self, timestamp: float, parked: bool, voltage: Optional[float]) -> bool:
+        """Feed the parking state and voltage (V) at timestamp (epoch seconds).
+
+        Returns:
+            True if the estimate changed
+        """
+        if not parked:
+            self.parked_since = None
+            return False
+        if self.parked_since is None:
+            self.parked_since = timestamp
+            self.fit.reset()
+            return False
+        if voltage is None or timestamp - self.parked_since < self.settle_time:
+            return False
+
+        fit = self.fit
+        fit.add(timestamp / 3600, voltage)
+        slope = fit.slope
+        if slope is None or fit.span < self.min_span:
+            return False
+        self.value = slope * 1000
+        return True
+
+
+class IdleRatio:
+    """Share of engine running time spent standing, in percent.
+
+    Running time is credited to the state of the update that started it
+    (as in TripDetector) and decays with half_life seconds of engine time.
+    Gaps longer than max_gap (lost connection) count as max_gap.
+    """
+
+    __slots__ = ("half_life", "max_gap", "engine_time", "idle_time", "_last_time", "_last_running", "_last_moving")
+
+    def __init__(self, half_life: float = 36000.0, max_gap: float = 600.0):
+        """Initialize the estimator.
+
+        Args:
+            half_life: Seconds of engine time after which time weighs half
+            max_gap: Longest gap in seconds credited between two updates
+        """
+        self.half_life = half_life
+        self.max_gap = max_gap
+        self.engine_time = 0.0
+        self.idle_time = 0.0
+        self._last_time: Optional[float] = None
+        self._last_running = False
+        self._last_moving = False
+
+    @property
+    def value(self) -> Optional[float]:
+        """Return the idle share (None before a minute of engine time)."""
+        if self.engine_time < 60:
+            return None
+        return self.idle_time / self.engine_time * 100
+
+    def update(self, timestamp: float, running: bool, moving: bool) -> bool:
+        """Feed the engine and movement state at timestamp (epoch seconds).
+
+        Returns:
+            True if the estimate changed
+        """
+        changed = False
+        if self._last_time is not None and self._last_running:
+            elapsed = min(max(0.0, timestamp - self._last_time), self.max_gap)
+            if elapsed:
+                decay = 0.5 ** (elapsed / self.half_life)
+                self.engine_time = self.engine_time * decay + elapsed
+                self.idle_time = self.idle_time * decay + (0.0 if self._last_moving else elapsed)
+                changed = True
+        self._last_time = timestamp
+        self._last_running = running
+        self._last_moving = moving
+        return changed
+
+
+class DeviceMetrics:
+    """Derived metrics of one device.
+
+    The properties are named like the keys of METRIC_SENSOR_TYPES.
+    """
+
+    __slots__ = ("moving_speed", "fuel", "battery", "idle")
+
+    def __init__(self, moving_speed: float = 3.0):
+        """Initialize the estimators (moving_speed in km/h)."""
+        self.moving_speed = moving_speed
+        self.fuel = FuelConsumption()
+        self.battery = BatteryDrain()
+        self.idle = IdleRatio()
+
+    @property
+    def fuel_consumption(self) -> Optional[float]:
+        """Return the rolling consumption in L/100 km."""
+        return self.fuel.value
+
+    @property
+    def battery_drain(self) -> Optional[float]:
+        """Return the parked voltage slope in mV/h (negative = draining)."""
+        return self.battery.value
+
+    @property
+    def idle_ratio(self) -> Optional[float]:
+        """Return the engine idle share in percent."""
+        return self.idle.value
+
+    def update(
+        self,
+        timestamp: float,
+        ignition: Optional[bool],
+        speed: Optional[float],
+        rpm: Optional[float],
+        odometer: Optional[float],
+        fuel: Optional[float],
+        voltage: Optional[float],
+    ) -> bool:
+        """Feed one device update.
+
+        Args:
+            timestamp: Update time (epoch seconds)
+            ignition: True if the engine runs (None = unknown)
+            speed: Speed in km/h (None = unknown)
+            rpm: Engine RPM (None = unknown)
+            odometer: Odometer in km (None = unknown)
+            fuel: Fuel level in liters (None = unknown)
+            voltage: Battery voltage in V (None = unknown)
+
+        Returns:
+            True if any metric changed
+        """
+        moving = speed is not None and speed >= self.moving_speed
+        running = bool(ignition) or (rpm is not None and rpm > 0)
+        changed = self.fuel.update(odometer, fuel)
+        changed |= self.battery.update(timestamp, not running and not moving, voltage)
+        changed |= self.idle.update(timestamp, running, moving)
+        return changed
@@ -0,0 +1,119 @@
+"""Reconnect scheduling for the Prizrak client."""
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+# Failure kinds that count towards opening the circuit
+FAILURE_AUTH = "auth"
+FAILURE_SERVER = "server"
+FAILURE_NETWORK = "network"
+CIRCUIT_FAILURES = (FAILURE_AUTH, FAILURE_SERVER)
+
+
+class ReconnectScheduler:
+    """Decide when the next connection attempt may run.
+
+    Delays use decorrelated jitter (each delay is drawn between the base
+    delay and three times the previous one, capped), so many clients that
+    lost the server at the same moment spread out instead of reconnecting
+    in lockstep. Repeated auth or 5xx failures open a circuit that holds
+    all attempts for open_duration seconds; the first attempt after that
+    is a probe, and another failure re-opens the circuit straight away.
+    """
+
+    def __init__(
+        self,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        failure_threshold: int = 5,
+        open_duration: float = 300.0,
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            base_delay: Smallest delay between attempts (seconds)
+            max_delay: Largest delay between attempts (seconds)
+            failure_threshold: Consecutive auth/5xx failures that open the circuit
+            open_duration: How long an open circuit blocks attempts (seconds)
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.open_duration = open_duration
+
+        self._last_delay = base_delay
+        self.consecutive_failures = 0
+        self.circuit_open_until = 0.0
+        self.attempts = 0
+
+        # Time from the first drop to the next working connection
+        self._disconnected_at: Optional[float] = None
+        self.reconnect_durations: deque = deque(maxlen=50)
+
+    @property
+    def circuit_open(self) -> bool:
+        """Return True while the circuit blocks connection attempts."""
+        return time.monotonic() < self.circuit_open_until
+
+    def next_delay(self, delay: Optional[float] = None) -> float:
+        """Return how long to wait before the next attempt.
+
+        Args:
+            delay: Fixed delay to use instead of the jittered one
+
+        Returns:
+            The delay, extended to the end of an open circuit if needed
+        """
+        if delay is None:
+            upper = max(self.base_delay, self._last_delay * 3)
+            delay = min(self.max_delay, random.uniform(self.base_delay, upper))
+            self._last_delay = delay
+        return max(delay, self.circuit_open_until - time.monotonic())
+
+    def mark_disconnected(self):
+        """Start the time-to-reconnect clock (first drop only)."""
+        if self._disconnected_at is None:
+            self._disconnected_at = time.monotonic()
+
+    def record_failure(self, kind: str = FAILURE_NETWORK):
+        """Record a failed attempt; auth and server errors feed the circuit."""
+        self.attempts += 1
+        self.mark_disconnected()
+        if kind not in CIRCUIT_FAILURES:
+            return
+
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self.circuit_open_until = time.monotonic() + self.open_duration
+            _LOGGER.warning(
+                f"{self.consecutive_failures} consecutive {kind} failures, "
+                f"pausing reconnects for {self.open_duration:.0f}s"
+            )
+
+    def record_success(self):
+        """Reset backoff and circuit after a working connection."""
+        if self._disconnected_at is not None:
+            duration = time.monotonic() - self._disconnected_at
+            self.reconnect_durations.append(duration)
+            _LOGGER.info(f"Reconnected after {duration:.1f}s ({self.attempts} failed attempt(s))")
+        self._disconnected_at = None
+        self._last_delay = self.base_delay
+        self.consecutive_failures = 0
+        self.circuit_open_until = 0.0
+        self.attempts = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return reconnect statistics."""
+        durations = list(self.reconnect_durations)
+        return {
+            "reconnects": len(durations),
+            "last_time_to_reconnect": durations[-1] if durations else None,
+            "avg_time_to_reconnect": sum(durations) / len(durations) if durations else None,
+            "max_time_to_reconnect": max(durations) if durations else None,
+            "circuit_open": self.circuit_open,
+            "consecutive_failures": self.consecutive_failures,
+        }
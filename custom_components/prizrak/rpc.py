@@ -0,0 +1,194 @@
+"""Invocation tracking for SignalR hub calls."""
+import asyncio
+import heapq
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class InvocationError(Exception):
+    """Server completed an invocation with an error."""
+
+
+class ConnectionLostError(ConnectionError):
+    """Connection dropped while an invocation was pending."""
+
+
+class PendingInvocation:
+    """An invocation waiting for its completion message."""
+
+    __slots__ = ("invocation_id", "target", "future", "deadline", "sent_at")
+
+    def __init__(self, invocation_id: str, target: str, future: asyncio.Future, deadline: float):
+        """Initialize the pending invocation."""
+        self.invocation_id = invocation_id
+        self.target = target
+        self.future = future
+        self.deadline = deadline
+        self.sent_at = time.monotonic()
+
+
+class TargetStats:
+    """Latency and outcome counters for one hub method."""
+
+    __slots__ = ("calls", "errors", "timeouts", "total_latency", "max_latency", "last_latency")
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_latency = 0.0
+
+    def record(self, latency: float):
+        """Record the latency of a completed call."""
+        self.calls += 1
+        self.total_latency += latency
+        self.last_latency = latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the counters as a dict (latencies in ms)."""
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "avg_ms": round(self.total_latency / self.calls * 1000, 1) if self.calls else None,
+            "max_ms": round(self.max_latency * 1000, 1),
+            "last_ms": round(self.last_latency * 1000, 1),
+        }
+
+
+class RpcMultiplexer:
+    """Match hub invocations with their completions.
+
+    All deadlines live in one heap served by a single event loop timer, so
+    there is no wait_for task per call. Completing an invocation is a dict
+    pop; its heap entry is dropped lazily when it reaches the top. A
+    completion for an id that already timed out or was cancelled is
+    counted and ignored.
+    """
+
+    def __init__(self):
+        """Initialize the multiplexer."""
+        self._counter = 0
+        self._pending: Dict[str, PendingInvocation] = {}
+        self._deadlines: List[Tuple[float, str]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_deadline = 0.0
+        self.stats: Dict[str, TargetStats] = {}
+        self.late_completions = 0
+
+    def __len__(self) -> int:
+        """Return the number of pending invocations."""
+        return len(self._pending)
+
+    def create(self, target: str, timeout: float) -> PendingInvocation:
+        """Register a new invocation and return it.
+
+        Args:
+            target: Hub method name
+            timeout: Seconds until the invocation fails with TimeoutError
+        """
+        loop = asyncio.get_running_loop()
+        self._counter += 1
+        invocation_id = str(self._counter)
+        deadline = loop.time() + timeout
+        pending = PendingInvocation(invocation_id, target, loop.create_future(), deadline)
+        self._pending[invocation_id] = pending
+
+        heapq.heappush(self._deadlines, (deadline, invocation_id))
+        if self._timer is None or deadline < self._timer_deadline:
+            self._schedule_timer(loop)
+        return pending
+
+    def complete(self, invocation_id: str, result: Any = None, error: Any = None) -> Optional[PendingInvocation]:
+        """Resolve an invocation from a completion message.
+
+        Returns:
+            The invocation, or None if it is unknown (late or foreign)
+        """
+        pending = self._pending.pop(invocation_id, None)
+        if pending is None:
+            self.late_completions += 1
+            _LOGGER.debug(f"Ignoring completion for unknown invocation {invocation_id}")
+            return None
+
+        # Compact stale heap entries once they outnumber live ones (amortized O(1))
+        if len(self._deadlines) > 2 * len(self._pending) + 64:
+            self._deadlines = [entry for entry in self._deadlines if entry[1] in self._pending]
+            heapq.heapify(self._deadlines)
+
+        stats = self._target_stats(pending.target)
+        if error:
+            stats.errors += 1
+        stats.record(time.monotonic() - pending.sent_at)
+
+        if not pending.future.done():
+            if error:
+                pending.future.set_exception(InvocationError(error))
+            else:
+                pending.future.set_result(result)
+        return pending
+
+    def discard(self, invocation_id: str):
+        """Forget an invocation whose caller gave up (e.g. send failed)."""
+        self._pending.pop(invocation_id, None)
+
+    def fail_all(self, exc: Exception):
+        """Fail every pending invocation (called on disconnect)."""
+        if self._pending:
+            _LOGGER.warning(f"Cleaning up {len(self._pending)} pending invocations")
+        for pending in self._pending.values():
+            if not pending.future.done():
+                pending.future.set_exception(exc)
+                # Mark retrieved so unawaited futures do not log warnings
+                pending.future.exception()
+        self._pending.clear()
+        self._deadlines.clear()
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def stats_by_target(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-target latency stats."""
+        return {target: stats.as_dict() for target, stats in self.stats.items()}
+
+    def _target_stats(self, target: str) -> TargetStats:
+        """Return (creating if needed) the stats for a target."""
+        stats = self.stats.get(target)
+        if stats is None:
+            stats = self.stats[target] = TargetStats()
+        return stats
+
+    def _schedule_timer(self, loop: asyncio.AbstractEventLoop):
+        """Arm the single timer for the earliest live deadline."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        # Drop heap entries of invocations that already completed
+        while self._deadlines and self._deadlines[0][1] not in self._pending:
+            heapq.heappop(self._deadlines)
+        if self._deadlines:
+            self._timer_deadline = self._deadlines[0][0]
+            self._timer = loop.call_at(self._timer_deadline, self._expire, loop)
+
+    def _expire(self, loop: asyncio.AbstractEventLoop):
+        """Fail every invocation whose deadline has passed."""
+        self._timer = None
+        now = loop.time()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, invocation_id = heapq.heappop(self._deadlines)
+            pending = self._pending.pop(invocation_id, None)
+            if pending is None:
+                continue
+            self._target_stats(pending.target).timeouts += 1
+            if not pending.future.done():
+                pending.future.set_exception(asyncio.TimeoutError())
+                pending.future.exception()
+        self._schedule_timer(loop)
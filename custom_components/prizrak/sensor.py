@@ -4,14 +4,24 @@ from __future__ import annotations
 import logging
 from typing import Any
 
-from homeassistant.components.sensor import SensorDeviceClass, SensorEntity
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN, SENSOR_TYPES
+from .const import (
+    DOMAIN,
+    METRIC_SENSOR_TYPES,
+    SENSOR_DEADBANDS,
+    SENSOR_STATE_CLASSES,
+    SENSOR_TYPES,
+    STATISTICS_SENSORS,
+    TRIP_SENSOR_TYPES,
+)
 from .coordinator import PrizrakDataUpdateCoordinator
+from .entity import PrizrakEntity, compile_state_accessor
+from .trips import Trip
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -48,33 +58,40 @@ async def async_setup_entry(
                 )
             )
 
-    async_add_entities(entities)
-
-
-def get_nested_value(data: dict, key: str) -> Any:
-    """Get value from nested dictionary using dot notation.
-
-    Args:
-        data: Dictionary to search
-        key: Key in dot notation (e.g., 'geo.lat' or 'balance.value')
+        for sensor_key, (name, unit, device_class, icon) in TRIP_SENSOR_TYPES.items():
+            entities.append(
+                PrizrakTripSensor(
+                    coordinator,
+                    device_id,
+                    device_name,
+                    device_model,
+                    sensor_key,
+                    name,
+                    unit,
+                    device_class,
+                    icon,
+                )
+            )
 
-    Returns:
-        Value if found, None otherwise
-    """
-    if '.' not in key:
-        return data.get(key)
+        for sensor_key, (name, unit, device_class, icon) in METRIC_SENSOR_TYPES.items():
+            entities.append(
+                PrizrakMetricSensor(
+                    coordinator,
+                    device_id,
+                    device_name,
+                    device_model,
+                    sensor_key,
+                    name,
+                    unit,
+                    device_class,
+                    icon,
+                )
+            )
 
-    keys = key.split('.')
-    value = data
-    for k in keys:
-        if isinstance(value, dict):
-            value = value.get(k)
-        else:
-            return None
-    return value
+    async_add_entities(entities)
 
 
-class PrizrakSensor(CoordinatorEntity, SensorEntity):
+class PrizrakSensor(PrizrakEntity, SensorEntity):
     """Representation of a Prizrak sensor."""
 
     def __init__(
@@ -96,15 +113,28 @@ class PrizrakSensor(CoordinatorEntity, SensorEntity):
         self._device_name = device_name
         self._sensor_key = sensor_key
         self._state_key = state_key
+        self._state_accessor = compile_state_accessor(state_key)
+
+        # Smallest change worth a state write (None = write every change)
+        self._deadband = SENSOR_DEADBANDS.get(sensor_key)
+        self._published_value: Any = None
 
         # Entity name and ID
         self._attr_name = name  # Friendly name shown in UI
         self._attr_unique_id = f"prizrak_{device_id}_{sensor_key}"
         self.entity_id = f"sensor.prizrak_{device_id}_{sensor_key}"  # Force entity_id
-        self._attr_unit_of_measurement = unit
+        self._attr_native_unit_of_measurement = unit
         self._attr_device_class = device_class
         self._attr_icon = icon
 
+        # In statistics mode the coordinator imports hourly statistics instead
+        if coordinator.statistics_mode and sensor_key in STATISTICS_SENSORS:
+            self._attr_state_class = None
+        else:
+            self._attr_state_class = SENSOR_STATE_CLASSES.get(sensor_key)
+        # HA rejects non-numeric states of sensors with a unit or state class
+        self._numeric = unit is not None or self._attr_state_class is not None
+
         # Device info for grouping
         self._attr_device_info = {
             "identifiers": {(DOMAIN, str(device_id))},
@@ -114,11 +144,207 @@ class PrizrakSensor(CoordinatorEntity, SensorEntity):
             "suggested_area": "Garage",
         }
 
+    @property
+    def state_keys(self) -> tuple[str, ...]:
+        """Return the state keys this sensor reads."""
+        return (self._state_key,)
+
     @property
     def native_value(self) -> Any:
         """Return the state of the sensor."""
-        device_state = self.coordinator.devices.get(self._device_id, {})
-        return get_nested_value(device_state, self._state_key)
+        value = self._state_value()
+        if self._numeric and not isinstance(value, (int, float)):
+            return None
+        return value
+
+    def is_significant_change(self, force: bool = False) -> bool:
+        """Return True unless the value moved less than the deadband."""
+        value = self.native_value
+        last = self._published_value
+        if (
+            not force
+            and self._deadband is not None
+            and isinstance(value, (int, float))
+            and isinstance(last, (int, float))
+            # Stopping (speed 0, engine off) is always a real change
+            and value != 0
+            and last != 0
+            and abs(value - last) < self._deadband
+        ):
+            return False
+        self._published_value = value
+        return True
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        return self._device_id in self.coordinator.devices
+
+
+class PrizrakTripSensor(PrizrakEntity, SensorEntity):
+    """Total of the trip in progress, or of the last trip when parked."""
+
+    def __init__(
+        self,
+        coordinator: PrizrakDataUpdateCoordinator,
+        device_id: int,
+        device_name: str,
+        device_model: str,
+        sensor_key: str,
+        name: str,
+        unit: str | None,
+        device_class: str | None,
+        icon: str | None,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._device_id = device_id
+        self._device_name = device_name
+        self._sensor_key = sensor_key
+        self._published_value: Any = None
+
+        # Entity name and ID
+        self._attr_name = name
+        self._attr_unique_id = f"prizrak_{device_id}_{sensor_key}"
+        self.entity_id = f"sensor.prizrak_{device_id}_{sensor_key}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+        self._attr_icon = icon
+
+        # Device info for grouping
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, str(device_id))},
+            "name": device_name,
+            "manufacturer": "Prizrak",
+            "model": device_model,
+            "suggested_area": "Garage",
+        }
+
+    @property
+    def state_keys(self) -> tuple[str, ...]:
+        """Return the pseudo key the coordinator sets when trips change."""
+        return ("trip",)
+
+    def _trip(self) -> Trip | None:
+        """Return the trip in progress, else the last completed one."""
+        detector = self.coordinator.trips.get(self._device_id)
+        if detector is None:
+            return None
+        return detector.current or detector.last_trip
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the trip total, rounded as displayed."""
+        trip = self._trip()
+        if trip is None:
+            return None
+        if self._sensor_key == "trip_distance":
+            return round(trip.distance, 1)
+        if self._sensor_key == "trip_duration":
+            return round(trip.duration / 60)
+        if self._sensor_key == "trip_max_speed":
+            return round(trip.max_speed)
+        return round(trip.idle_time / 60)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return whether the trip is still in progress and when it started."""
+        detector = self.coordinator.trips.get(self._device_id)
+        trip = self._trip()
+        if trip is None:
+            return {}
+        return {
+            "in_progress": trip is detector.current,
+            "start_time": dt_util.utc_from_timestamp(trip.start_time),
+            "trips_completed": detector.trips_completed,
+        }
+
+    def is_significant_change(self, force: bool = False) -> bool:
+        """Return True if the displayed value, the trip or its progress changed."""
+        detector = self.coordinator.trips.get(self._device_id)
+        trip = self._trip()
+        published = (
+            self.native_value,
+            trip.start_time if trip else None,
+            trip is not None and trip is detector.current,
+        )
+        if published == self._published_value and not force:
+            return False
+        self._published_value = published
+        return True
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        return self._device_id in self.coordinator.devices
+
+
+class PrizrakMetricSensor(PrizrakEntity, SensorEntity):
+    """Metric derived from the update stream (fuel consumption, battery drain, idle ratio)."""
+
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    # Displayed precision per metric
+    _PRECISION = {"fuel_consumption": 1, "battery_drain": 0, "idle_ratio": 0}
+
+    def __init__(
+        self,
+        coordinator: PrizrakDataUpdateCoordinator,
+        device_id: int,
+        device_name: str,
+        device_model: str,
+        sensor_key: str,
+        name: str,
+        unit: str | None,
+        device_class: str | None,
+        icon: str | None,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._device_id = device_id
+        self._device_name = device_name
+        self._sensor_key = sensor_key
+        self._published_value: Any = None
+
+        # Entity name and ID
+        self._attr_name = name
+        self._attr_unique_id = f"prizrak_{device_id}_{sensor_key}"
+        self.entity_id = f"sensor.prizrak_{device_id}_{sensor_key}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+        self._attr_icon = icon
+
+        # Device info for grouping
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, str(device_id))},
+            "name": device_name,
+            "manufacturer": "Prizrak",
+            "model": device_model,
+            "suggested_area": "Garage",
+        }
+
+    @property
+    def state_keys(self) -> tuple[str, ...]:
+        """Return the pseudo key the coordinator sets when metrics change."""
+        return ("metrics",)
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the metric, rounded as displayed (None until estimated)."""
+        metrics = self.coordinator.metrics.get(self._device_id)
+        value = getattr(metrics, self._sensor_key) if metrics is not None else None
+        if value is None:
+            return None
+        digits = self._PRECISION[self._sensor_key]
+        return round(value, digits) if digits else round(value)
+
+    def is_significant_change(self, force: bool = False) -> bool:
+        """Return True if the displayed value changed."""
+        value = self.native_value
+        if value == self._published_value and not force:
+            return False
+        self._published_value = value
+        return True
 
     @property
     def available(self) -> bool:
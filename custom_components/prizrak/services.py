@@ -0,0 +1,299 @@
+"""Services for the Prizrak Monitoring integration."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.const import ATTR_AREA_ID, ATTR_DEVICE_ID, ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import (
+    config_validation as cv,
+    device_registry as dr,
+    entity_registry as er,
+)
+from homeassistant.util import dt as dt_util
+
+from .commands import CommandSupersededError
+from .const import BUTTON_TYPES, DOMAIN
+from .coordinator import PrizrakDataUpdateCoordinator
+from .track import to_geojson, to_gpx
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_RECONNECT = "reconnect"
+SERVICE_SEND_COMMAND = "send_command"
+SERVICE_EXPORT_TRACK = "export_track"
+
+ATTR_COMMAND = "command"
+ATTR_MAX_CONCURRENCY = "max_concurrency"
+ATTR_TIMEOUT = "timeout"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_FORMAT = "format"
+ATTR_DIRECTORY = "directory"
+
+DEFAULT_MAX_CONCURRENCY = 10
+DEFAULT_COMMAND_TIMEOUT = 10.0
+DEFAULT_TRACK_DIRECTORY = "prizrak_tracks"  # under the config directory
+
+TRACK_FORMATS = {"gpx": to_gpx, "geojson": to_geojson}
+
+# Only the device commands: the name is invoked as a hub method as is
+DEVICE_COMMANDS = [command for _, command, _ in BUTTON_TYPES.values()]
+
+TARGET_FIELDS = {
+    vol.Optional(ATTR_DEVICE_ID, default=[]): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(ATTR_AREA_ID, default=[]): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(ATTR_ENTITY_ID, default=[]): cv.entity_ids,
+}
+
+SEND_COMMAND_SCHEMA = vol.Schema(
+    {
+        **TARGET_FIELDS,
+        vol.Required(ATTR_COMMAND): vol.In(DEVICE_COMMANDS),
+        vol.Optional(ATTR_MAX_CONCURRENCY, default=DEFAULT_MAX_CONCURRENCY): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100)
+        ),
+        vol.Optional(ATTR_TIMEOUT, default=DEFAULT_COMMAND_TIMEOUT): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=120)
+        ),
+    }
+)
+
+EXPORT_TRACK_SCHEMA = vol.Schema(
+    {
+        **TARGET_FIELDS,
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_FORMAT, default="gpx"): vol.In(list(TRACK_FORMATS)),
+        vol.Optional(ATTR_DIRECTORY): cv.string,
+    }
+)
+
+
+def _coordinators(hass: HomeAssistant) -> list[PrizrakDataUpdateCoordinator]:
+    """Return the coordinators of all loaded config entries."""
+    return [
+        value for value in hass.data.get(DOMAIN, {}).values()
+        if isinstance(value, PrizrakDataUpdateCoordinator)
+    ]
+
+
+def _resolve_targets(
+    hass: HomeAssistant, call: ServiceCall
+) -> dict[int, PrizrakDataUpdateCoordinator]:
+    """Map the targeted HA devices, entities and areas to Prizrak device ids."""
+    device_registry = dr.async_get(hass)
+    entity_registry = er.async_get(hass)
+    registry_ids = set(call.data[ATTR_DEVICE_ID])
+    for entity_id in call.data[ATTR_ENTITY_ID]:
+        entity = entity_registry.async_get(entity_id)
+        if entity and entity.device_id:
+            registry_ids.add(entity.device_id)
+    for area_id in call.data[ATTR_AREA_ID]:
+        registry_ids.update(
+            device.id for device in dr.async_entries_for_area(device_registry, area_id)
+        )
+
+    owners: dict[int, PrizrakDataUpdateCoordinator] = {}
+    for coordinator in _coordinators(hass):
+        for device_info in coordinator.client.devices:
+            owners[device_info["device_id"]] = coordinator
+
+    targets: dict[int, PrizrakDataUpdateCoordinator] = {}
+    for registry_id in registry_ids:
+        device = device_registry.async_get(registry_id)
+        if device is None:
+            continue
+        for domain, identifier in device.identifiers:
+            if domain != DOMAIN:
+                continue
+            try:
+                device_id = int(identifier)
+            except ValueError:
+                continue
+            if device_id in owners:
+                targets[device_id] = owners[device_id]
+    return targets
+
+
+async def _async_send_one(
+    coordinator: PrizrakDataUpdateCoordinator,
+    device_id: int,
+    command: str,
+    timeout: float,
+    semaphore: asyncio.Semaphore,
+) -> dict[str, Any]:
+    """Send a command to one device and describe the outcome."""
+    async with semaphore:
+        start = time.monotonic()
+        result: dict[str, Any] = {"success": False, "error": None}
+        if not coordinator.client.websocket:
+            result["error"] = "not connected"
+        else:
+            try:
+                result["success"] = await coordinator.commands.submit(device_id, command, timeout=timeout)
+                if not result["success"]:
+                    result["error"] = "rejected or timed out"
+            except CommandSupersededError as e:
+                result["error"] = str(e)
+            except Exception as e:
+                result["error"] = str(e) or type(e).__name__
+        result["latency_ms"] = round((time.monotonic() - start) * 1000)
+        return result
+
+
+async def _async_handle_send_command(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Send one command to every targeted device."""
+    command = call.data[ATTR_COMMAND]
+    targets = _resolve_targets(hass, call)
+    if not targets:
+        raise ServiceValidationError("No Prizrak devices match the given devices, entities or areas")
+
+    _LOGGER.info(f"Sending {command} to {len(targets)} device(s)")
+    semaphore = asyncio.Semaphore(call.data[ATTR_MAX_CONCURRENCY])
+    start = time.monotonic()
+
+    device_ids = list(targets)
+    outcomes = await asyncio.gather(*(
+        _async_send_one(targets[device_id], device_id, command, call.data[ATTR_TIMEOUT], semaphore)
+        for device_id in device_ids
+    ))
+    total_latency_ms = round((time.monotonic() - start) * 1000)
+
+    results = {str(device_id): outcome for device_id, outcome in zip(device_ids, outcomes)}
+    succeeded = sum(1 for outcome in outcomes if outcome["success"])
+    _LOGGER.info(
+        f"Command {command}: {succeeded}/{len(outcomes)} succeeded in {total_latency_ms} ms"
+    )
+    return {
+        "command": command,
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(outcomes) - succeeded,
+        "total_latency_ms": total_latency_ms,
+    }
+
+
+def _timestamp(value: datetime | None) -> float | None:
+    """Return a service datetime as epoch seconds (naive = local time)."""
+    return None if value is None else dt_util.as_utc(value).timestamp()
+
+
+def _write_file(path: str, content: str) -> None:
+    """Write an export file, creating its directory (runs in the executor)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(content)
+
+
+async def _async_handle_export_track(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Write the in-memory track of every targeted device to a file."""
+    targets = _resolve_targets(hass, call)
+    if not targets:
+        raise ServiceValidationError("No Prizrak devices match the given devices, entities or areas")
+
+    directory = call.data.get(ATTR_DIRECTORY)
+    if directory is None:
+        directory = hass.config.path(DEFAULT_TRACK_DIRECTORY)
+    elif not hass.config.is_allowed_path(directory):
+        raise ServiceValidationError(
+            f"Directory {directory} is not in allowlist_external_dirs"
+        )
+
+    start = _timestamp(call.data.get(ATTR_START))
+    end = _timestamp(call.data.get(ATTR_END))
+    file_format = call.data[ATTR_FORMAT]
+    render = TRACK_FORMATS[file_format]
+
+    results: dict[str, dict[str, Any]] = {}
+    for device_id, coordinator in targets.items():
+        track = coordinator.tracks.get(device_id)
+        points = track.points(start, end) if track else []
+        result: dict[str, Any] = {"points": len(points), "file": None}
+        results[str(device_id)] = result
+        if not points:
+            result["error"] = "no track points in range"
+            continue
+
+        name = next(
+            (device.get("name") for device in coordinator.client.devices if device["device_id"] == device_id),
+            None,
+        ) or f"Prizrak {device_id}"
+        first = dt_util.utc_from_timestamp(points[0][0])
+        path = os.path.join(directory, f"prizrak_{device_id}_{first:%Y%m%d_%H%M%S}.{file_format}")
+        await hass.async_add_executor_job(_write_file, path, render(points, name))
+        result["file"] = path
+        _LOGGER.info(f"Exported {len(points)} track point(s) of device {device_id} to {path}")
+
+    return {"results": results}
+
+
+async def _async_handle_reconnect(hass: HomeAssistant, call: ServiceCall) -> None:
+    """Force every account to reconnect."""
+    _LOGGER.info("Reconnect service called - forcing reconnection...")
+    for coordinator in _coordinators(hass):
+        client = coordinator.client
+
+        # Close current WebSocket connection to trigger reconnect
+        if client.websocket:
+            try:
+                await client.websocket.close()
+                _LOGGER.info(f"WebSocket of {client.login} closed, will reconnect automatically")
+            except Exception as e:
+                _LOGGER.error(f"Error closing WebSocket: {e}")
+
+        # Reset connection_id to force new negotiation
+        client.connection_id = None
+    _LOGGER.info("Connection IDs reset for clean reconnection")
+
+
+def async_register_services(hass: HomeAssistant) -> None:
+    """Register the integration-wide services (once)."""
+    if hass.services.has_service(DOMAIN, SERVICE_SEND_COMMAND):
+        return
+
+    async def handle_reconnect(call: ServiceCall) -> None:
+        """Handle the reconnect service call."""
+        await _async_handle_reconnect(hass, call)
+
+    hass.services.async_register(DOMAIN, SERVICE_RECONNECT, handle_reconnect)
+
+    async def handle_send_command(call: ServiceCall) -> ServiceResponse:
+        """Handle the send_command service call."""
+        return await _async_handle_send_command(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SEND_COMMAND,
+        handle_send_command,
+        schema=SEND_COMMAND_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def handle_export_track(call: ServiceCall) -> ServiceResponse:
+        """Handle the export_track service call."""
+        return await _async_handle_export_track(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_TRACK,
+        handle_export_track,
+        schema=EXPORT_TRACK_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def async_unregister_services(hass: HomeAssistant) -> None:
+    """Remove the integration-wide services once no entry is loaded."""
+    if not _coordinators(hass):
+        hass.services.async_remove(DOMAIN, SERVICE_RECONNECT)
+        hass.services.async_remove(DOMAIN, SERVICE_SEND_COMMAND)
+        hass.services.async_remove(DOMAIN, SERVICE_EXPORT_TRACK)
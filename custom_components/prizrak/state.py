@@ -0,0 +1,342 @@
+"""Typed, compact device state records."""
+import logging
+import sys
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def decode_number(value: Any) -> Any:
+    """Return a JSON number as int/float, parsing numeric strings once.
+
+    Values that are not numbers are kept as they are.
+    """
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                return value
+    return value
+
+
+def decode_enum(value: Any) -> Any:
+    """Return an enum string interned, so every car shares one object."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+def decode_text(value: Any) -> Any:
+    """Return free text as is."""
+    return value
+
+
+def decode_time(value: Any) -> Optional[datetime]:
+    """Return an ISO 8601 timestamp as datetime (None if unparsable)."""
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        _LOGGER.warning(f"Could not parse timestamp: {value}")
+        return None
+
+
+def _leaf_paths(value: Any, prefix: str, changed: Set[str]):
+    """Add the dotted path of every field under a nested dict or record."""
+    for key, item in value.items():
+        path = f"{prefix}.{key}"
+        changed.add(path)
+        if isinstance(item, (dict, StateRecord)):
+            _leaf_paths(item, path, changed)
+
+
+def _diff_nested(old: Dict[str, Any], new: Dict[str, Any], prefix: str, changed: Set[str]):
+    """Add the dotted paths that differ between two nested dicts."""
+    for key in old.keys() | new.keys():
+        old_value = old.get(key, _MISSING)
+        new_value = new.get(key, _MISSING)
+        if old_value == new_value:
+            continue
+        path = f"{prefix}.{key}"
+        changed.add(path)
+        if isinstance(old_value, dict) and isinstance(new_value, dict):
+            _diff_nested(old_value, new_value, path, changed)
+        elif isinstance(new_value, dict):
+            _leaf_paths(new_value, path, changed)
+        elif isinstance(old_value, dict):
+            _leaf_paths(old_value, path, changed)
+
+
+class StateRecord:
+    """Device state block with a slot per known field.
+
+    FIELDS maps each known field to its decoder, or to a StateRecord
+    subclass for a nested block. Values are decoded once on merge, so
+    readers get numbers, interned enums and datetimes. Unset fields hold
+    None; fields missing from the schema go to a small overflow dict.
+    The record reads like a dict (get, [], in, items) for generic code.
+    """
+
+    __slots__ = ("_extra",)
+    FIELDS: Dict[str, Any] = {}
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        """Initialize the record, decoding data if given."""
+        for name in self.FIELDS:
+            setattr(self, name, None)
+        self._extra: Optional[Dict[str, Any]] = None
+        if data:
+            self._merge(data, "", set())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return a field value, or default if it is not set."""
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            return default if value is None else value
+        if self._extra:
+            return self._extra.get(key, default)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        """Return a field value, raising KeyError if it is not set."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        """Return True if the field is set."""
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the names of the set fields."""
+        return (key for key, _ in self.items())
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Iterate over (name, value) of the set fields."""
+        for name in self.FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                yield name, value
+        if self._extra:
+            yield from self._extra.items()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the state as plain nested dicts (e.g. for storage)."""
+        return {
+            key: value.as_dict() if isinstance(value, StateRecord) else value
+            for key, value in self.items()
+        }
+
+    def merge(self, update: Dict[str, Any]) -> Set[str]:
+        """Merge a partial state into the record and return what changed.
+
+        Top-level fields are replaced as with dict.update; a nested block is
+        replaced as a whole. Changed fields are reported as dotted paths: a
+        new geo.lat yields {"geo", "geo.lat"}, so consumers can match either
+        a whole block or a single field.
+
+        Returns:
+            The changed paths (empty if the update repeated known values)
+        """
+        changed: Set[str] = set()
+        self._merge(update, "", changed)
+        return changed
+
+    def _merge(self, update: Dict[str, Any], prefix: str, changed: Set[str]):
+        """Merge update into the record, adding changed paths under prefix."""
+        fields = self.FIELDS
+        for key, value in update.items():
+            if key not in fields:
+                self._merge_extra(key, value, prefix + key, changed)
+                continue
+            old = getattr(self, key)
+            # Most fields of most events repeat the known (already decoded) value
+            if value == old:
+                continue
+
+            spec = fields[key]
+            if isinstance(spec, type):
+                if isinstance(value, dict):
+                    if old is None:
+                        old = spec()
+                        setattr(self, key, old)
+                        changed.add(prefix + key)
+                    count = len(changed)
+                    old._assign(value, prefix + key + ".", changed)
+                    if len(changed) != count:
+                        changed.add(prefix + key)
+                    continue
+                if value is not None:
+                    _LOGGER.debug(f"Unexpected value for {prefix + key}: {value!r}")
+                value = None
+            else:
+                value = spec(value)
+                if value == old:
+                    continue
+
+            setattr(self, key, value)
+            changed.add(prefix + key)
+            if isinstance(old, StateRecord):
+                _leaf_paths(old, prefix + key, changed)
+
+    def _assign(self, value: Dict[str, Any], prefix: str, changed: Set[str]):
+        """Make the record hold exactly the fields of value."""
+        if not self.FIELDS.keys() <= value.keys():
+            for name in self.FIELDS.keys() - value.keys():
+                old = getattr(self, name)
+                if old is None:
+                    continue
+                setattr(self, name, None)
+                changed.add(prefix + name)
+                if isinstance(old, StateRecord):
+                    _leaf_paths(old, prefix + name, changed)
+        extra = self._extra
+        if extra:
+            for key in [key for key in extra if key not in value]:
+                old = extra.pop(key)
+                changed.add(prefix + key)
+                if isinstance(old, dict):
+                    _leaf_paths(old, prefix + key, changed)
+        self._merge(value, prefix, changed)
+
+    def _merge_extra(self, key: str, value: Any, path: str, changed: Set[str]):
+        """Store a field the schema does not know in the overflow dict."""
+        extra = self._extra
+        old = extra.get(key, _MISSING) if extra else _MISSING
+        # Deep comparison in C; most fields of most events are unchanged
+        if old == value:
+            return
+        if extra is None:
+            extra = self._extra = {}
+        extra[sys.intern(key)] = decode_enum(value)
+        changed.add(path)
+        if isinstance(value, dict) and isinstance(old, dict):
+            _diff_nested(old, value, path, changed)
+        elif isinstance(value, dict):
+            _leaf_paths(value, path, changed)
+        elif isinstance(old, dict):
+            _leaf_paths(old, path, changed)
+
+    def __repr__(self) -> str:
+        """Return the record as its dict form."""
+        return f"{type(self).__name__}({self.as_dict()!r})"
+
+
+class GeoRecord(StateRecord):
+    """GPS fix."""
+
+    FIELDS = {
+        "lat": decode_number,
+        "lon": decode_number,
+        "gps_state": decode_enum,
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class GeoExtRecord(StateRecord):
+    """GNSS details."""
+
+    FIELDS = {
+        "gnss_speed": decode_number,
+        "gnss_height": decode_number,
+        "gnss_sat_used": decode_number,
+        "gnss_azimuth": decode_number,
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class BalanceRecord(StateRecord):
+    """SIM card balance."""
+
+    FIELDS = {
+        "value": decode_number,
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class DeviceRecord(StateRecord):
+    """State of one device, accumulated from its EventObjects.
+
+    FIELDS lists what the entity platforms read (state keys of SENSOR_TYPES
+    and BINARY_SENSOR_TYPES); everything else the server sends is overflow.
+    """
+
+    FIELDS: Dict[str, Callable[[Any], Any]] = {
+        "serial_no": decode_text,
+        "last_update": decode_time,
+        "last_device_exchange_time": decode_time,
+        "connection_state": decode_enum,
+        # GPS
+        "geo": GeoRecord,
+        "geo_ext": GeoExtRecord,
+        # Telemetry
+        "accum_voltage": decode_number,
+        "fuel_level": decode_number,
+        "inside_temp": decode_number,
+        "outside_temp": decode_number,
+        "engine_temp": decode_number,
+        "speed": decode_number,
+        "rpm": decode_number,
+        "route": decode_number,
+        # GSM
+        "gsm_level": decode_number,
+        "sim_1_vendor": decode_enum,
+        "balance": BalanceRecord,
+        # Security & engine
+        "guard": decode_enum,
+        "alarm": decode_enum,
+        "ignition_switch": decode_enum,
+        "parking_brake": decode_enum,
+        # Doors & locks
+        "driver_door": decode_enum,
+        "front_pass_door": decode_enum,
+        "rear_left_door": decode_enum,
+        "rear_right_door": decode_enum,
+        "trunk": decode_enum,
+        "hood": decode_enum,
+        "central_lock": decode_enum,
+        # Heating
+        "driver_seat_heating_state": decode_enum,
+        "front_pass_seat_heating_state": decode_enum,
+        "rear_left_seat_heating_state": decode_enum,
+        "rear_right_seat_heating_state": decode_enum,
+        "front_window_heating_state": decode_enum,
+        "rear_window_heating_state": decode_enum,
+        "mirror_heating_state": decode_enum,
+        "wheel_heating_state": decode_enum,
+    }
+    __slots__ = tuple(FIELDS)
+
+
+def compile_state_accessor(key: str) -> Callable[[DeviceRecord], Any]:
+    """Return a function reading a dotted key (e.g. 'geo.lat') from a state.
+
+    The key is split once here instead of on every read. A top-level field
+    of the record schema is read straight from its slot. Missing or
+    non-mapping intermediate values give None.
+    """
+    if key in DeviceRecord.FIELDS:
+        return attrgetter(key)
+    if "." not in key:
+        return lambda state: state.get(key)
+
+    first, *rest = key.split(".")
+
+    def accessor(state: DeviceRecord) -> Any:
+        value = state.get(first)
+        for part in rest:
+            if not isinstance(value, (dict, StateRecord)):
+                return None
+            value = value.get(part)
+        return value
+
+    return accessor
@@ -0,0 +1,133 @@
+"""Persistent storage for the Prizrak integration."""
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .state import DeviceRecord
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+AUTH_STORAGE_KEY = f"{DOMAIN}.auth"
+AUTH_SAVE_DELAY = 1.0  # seconds
+DEVICE_STORAGE_KEY = f"{DOMAIN}.{{entry_id}}.devices"
+DEVICE_SAVE_DELAY = 60.0  # seconds
+
+
+class PrizrakAuthCache:
+    """Persist app version and auth token per account across restarts.
+
+    Entries are keyed by login (the config entry unique_id), so the config
+    flow can seed the cache before the config entry exists.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the cache."""
+        self._store: Store[dict[str, dict[str, Any]]] = Store(
+            hass, STORAGE_VERSION, AUTH_STORAGE_KEY
+        )
+        self._data: dict[str, dict[str, Any]] | None = None
+
+    async def async_load(self) -> None:
+        """Load cached data from disk (once)."""
+        if self._data is None:
+            self._data = await self._store.async_load() or {}
+
+    async def async_get(self, login: str) -> dict[str, Any]:
+        """Return cached auth data for a login."""
+        await self.async_load()
+        return dict(self._data.get(login, {}))
+
+    @callback
+    def async_set(self, login: str, cache: dict[str, Any]) -> None:
+        """Update cached auth data for a login and schedule a save."""
+        if self._data is None:
+            _LOGGER.debug("Auth cache not loaded yet, skipping update")
+            return
+        self._data[login] = cache
+        self._store.async_delay_save(lambda: self._data, AUTH_SAVE_DELAY)
+
+    async def async_remove(self, login: str) -> None:
+        """Drop cached auth data for a login."""
+        await self.async_load()
+        if self._data.pop(login, None) is not None:
+            await self._store.async_save(self._data)
+
+
+async def async_get_auth_cache(hass: HomeAssistant) -> PrizrakAuthCache:
+    """Return the shared, loaded auth cache."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    auth_cache = domain_data.get("auth_cache")
+    if auth_cache is None:
+        auth_cache = domain_data["auth_cache"] = PrizrakAuthCache(hass)
+    await auth_cache.async_load()
+    return auth_cache
+
+
+class PrizrakDeviceCache:
+    """Persist the device catalog and last-known device states.
+
+    Saves are write-behind: the first change after a save schedules one
+    write DEVICE_SAVE_DELAY seconds later, and later changes in that window
+    are folded into it. The write always picks up the latest state.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the cache."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, DEVICE_STORAGE_KEY.format(entry_id=entry_id)
+        )
+        self._save_pending = False
+        self._devices: list[dict[str, Any]] = []
+        self._device_states: dict[int, DeviceRecord] = {}
+
+    async def async_load(self) -> tuple[list[dict[str, Any]], dict[int, dict[str, Any]]] | None:
+        """Return the saved (devices, device_states) snapshot, if any."""
+        data = await self._store.async_load()
+        if not data or not data.get("devices"):
+            return None
+        device_states = {
+            int(device_id): state
+            for device_id, state in data.get("device_states", {}).items()
+        }
+        return data["devices"], device_states
+
+    @callback
+    def async_schedule_save(
+        self,
+        devices: list[dict[str, Any]],
+        device_states: dict[int, DeviceRecord],
+    ) -> None:
+        """Schedule a snapshot write unless one is already pending."""
+        self._devices = devices
+        self._device_states = device_states
+        if self._save_pending:
+            return
+        self._save_pending = True
+        self._store.async_delay_save(self._data_to_save, DEVICE_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the snapshot to write (called by the store at write time)."""
+        self._save_pending = False
+        return {
+            "devices": self._devices,
+            "device_states": {
+                str(device_id): state.as_dict()
+                for device_id, state in self._device_states.items()
+            },
+        }
+
+    async def async_flush(self) -> None:
+        """Write the latest snapshot now, replacing any pending delayed write."""
+        if self._devices:
+            await self._store.async_save(self._data_to_save())
+
+    async def async_remove(self) -> None:
+        """Delete the snapshot from disk."""
+        await self._store.async_remove()
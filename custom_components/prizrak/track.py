@@ -0,0 +1,237 @@
+"""In-memory GPS track of a device with online simplification."""
+import json
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+EARTH_RADIUS = 6371008.8  # meters
+
+# (timestamp, latitude, longitude, speed, azimuth); speed/azimuth NaN if unknown
+TrackPoint = Tuple[float, float, float, float, float]
+
+
+def _offset(lat0: float, lon0: float, lat: float, lon: float) -> Tuple[float, float]:
+    """Return a point as (x, y) meters from an origin.
+
+    Equirectangular projection: exact enough over the few kilometers
+    between two kept points of a track.
+    """
+    x = math.radians(lon - lon0) * math.cos(math.radians(lat0)) * EARTH_RADIUS
+    y = math.radians(lat - lat0) * EARTH_RADIUS
+    return x, y
+
+
+def _segment_distance(px: float, py: float, bx: float, by: float) -> float:
+    """Return the distance from (px, py) to the segment (0, 0)-(bx, by)."""
+    length2 = bx * bx + by * by
+    if length2 == 0:
+        return math.hypot(px, py)
+    t = max(0.0, min(1.0, (px * bx + py * by) / length2))
+    return math.hypot(px - t * bx, py - t * by)
+
+
+def douglas_peucker(lats: "array[float]", lons: "array[float]", tolerance: float) -> List[int]:
+    """Return the indices of the points kept by Douglas-Peucker.
+
+    Args:
+        lats: Latitudes of the track
+        lons: Longitudes of the track
+        tolerance: Largest distance in meters a dropped point may have
+            from the simplified line
+    """
+    count = len(lats)
+    if count <= 2:
+        return list(range(count))
+
+    keep = bytearray(count)
+    keep[0] = keep[-1] = 1
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        lat0, lon0 = lats[first], lons[first]
+        bx, by = _offset(lat0, lon0, lats[last], lons[last])
+        worst, worst_index = tolerance, -1
+        for index in range(first + 1, last):
+            distance = _segment_distance(*_offset(lat0, lon0, lats[index], lons[index]), bx, by)
+            if distance > worst:
+                worst, worst_index = distance, index
+        if worst_index >= 0:
+            keep[worst_index] = 1
+            stack.append((first, worst_index))
+            stack.append((worst_index, last))
+    return [index for index in range(count) if keep[index]]
+
+
+class TrackBuffer:
+    """Bounded, simplified GPS track of one device.
+
+    Kept points live in typed arrays (8 bytes per coordinate and timestamp,
+    4 per speed and azimuth). Incoming points are simplified on the fly with
+    an opening window: the newest point stays tentative while every point
+    since the last kept one lies within tolerance of the straight line to
+    it; once one does not, the previous tentative point is kept. Fixes
+    within half the tolerance of the previous one are skipped. When
+    max_points are kept, the track is compacted with Douglas-Peucker at
+    twice the tolerance, and if that is not enough the oldest half is
+    dropped.
+    """
+
+    def __init__(self, tolerance: float = 10.0, max_points: int = 1000, max_window: int = 100):
+        """Initialize the buffer.
+
+        Args:
+            tolerance: Largest deviation in meters of a dropped point
+            max_points: Most points kept before compaction
+            max_window: Most points folded into one straight segment (a
+                parked car still gets a point every max_window fixes)
+        """
+        self.tolerance = tolerance
+        self.max_points = max_points
+        self.max_window = max_window
+
+        self.timestamps = array("d")
+        self.lats = array("d")
+        self.lons = array("d")
+        self.speeds = array("f")
+        self.azimuths = array("f")
+
+        # Points since the last kept one; the newest is the tentative end
+        self._window: List[TrackPoint] = []
+
+        self.points_received = 0
+        self.points_skipped = 0
+        self.compactions = 0
+
+    def __len__(self) -> int:
+        """Return the number of points a full export would contain."""
+        return len(self.timestamps) + (1 if self._window else 0)
+
+    def append(
+        self,
+        timestamp: float,
+        lat: float,
+        lon: float,
+        speed: float = math.nan,
+        azimuth: float = math.nan,
+    ):
+        """Add a GPS fix (timestamp in seconds since the epoch)."""
+        point = (timestamp, lat, lon, speed, azimuth)
+        self.points_received += 1
+        if not self.timestamps:
+            self._keep(point)
+            return
+
+        window = self._window
+        if window:
+            # GPS jitter of a parked or crawling car adds nothing to the track
+            previous = window[-1]
+            if math.hypot(*_offset(previous[1], previous[2], lat, lon)) < self.tolerance / 2:
+                self.points_skipped += 1
+                return
+            lat0, lon0 = self.lats[-1], self.lons[-1]
+            bx, by = _offset(lat0, lon0, lat, lon)
+            tolerance = self.tolerance
+            if len(window) >= self.max_window or any(
+                _segment_distance(*_offset(lat0, lon0, other[1], other[2]), bx, by) > tolerance
+                for other in window
+            ):
+                self._keep(window[-1])
+                window.clear()
+        window.append(point)
+
+    def _keep(self, point: TrackPoint):
+        """Append a point to the kept track."""
+        timestamp, lat, lon, speed, azimuth = point
+        self.timestamps.append(timestamp)
+        self.lats.append(lat)
+        self.lons.append(lon)
+        self.speeds.append(speed)
+        self.azimuths.append(azimuth)
+        if len(self.timestamps) > self.max_points:
+            self._compact()
+
+    def _compact(self):
+        """Shrink the kept track to at most 3/4 of max_points."""
+        self.compactions += 1
+        indices = douglas_peucker(self.lats, self.lons, self.tolerance * 2)
+        limit = self.max_points * 3 // 4
+        if len(indices) > limit:
+            indices = indices[-(self.max_points // 2):]
+        for name in ("timestamps", "lats", "lons", "speeds", "azimuths"):
+            values = getattr(self, name)
+            setattr(self, name, array(values.typecode, (values[index] for index in indices)))
+
+    def points(self, start: Optional[float] = None, end: Optional[float] = None) -> List[TrackPoint]:
+        """Return the track between two timestamps (None = unbounded)."""
+        timestamps = self.timestamps
+        first = 0 if start is None else bisect_left(timestamps, start)
+        last = len(timestamps) if end is None else bisect_right(timestamps, end)
+        points = [
+            (timestamps[i], self.lats[i], self.lons[i], self.speeds[i], self.azimuths[i])
+            for i in range(first, last)
+        ]
+        # The tentative end is the current position
+        if self._window:
+            tentative = self._window[-1]
+            if (start is None or tentative[0] >= start) and (end is None or tentative[0] <= end):
+                points.append(tentative)
+        return points
+
+    def memory_usage(self) -> int:
+        """Return the bytes held by the point arrays."""
+        return sum(
+            values.itemsize * len(values)
+            for values in (self.timestamps, self.lats, self.lons, self.speeds, self.azimuths)
+        )
+
+
+def _iso_time(timestamp: float) -> str:
+    """Return a timestamp as ISO 8601 UTC ('2026-10-17T10:00:00Z')."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def to_gpx(points: List[TrackPoint], name: str) -> str:
+    """Return the points as a GPX 1.1 track."""
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<gpx version="1.1" creator="Prizrak Monitoring" xmlns="http://www.topografix.com/GPX/1/1">',
+        "  <trk>",
+        f"    <name>{escape(name)}</name>",
+        "    <trkseg>",
+    ]
+    for timestamp, lat, lon, _speed, _azimuth in points:
+        lines.append(
+            f"      <trkpt lat={quoteattr(f'{lat:.7f}')} lon={quoteattr(f'{lon:.7f}')}>"
+            f"<time>{_iso_time(timestamp)}</time></trkpt>"
+        )
+    lines += ["    </trkseg>", "  </trk>", "</gpx>", ""]
+    return "\n".join(lines)
+
+
+def to_geojson(points: List[TrackPoint], name: str) -> str:
+    """Return the points as a GeoJSON LineString feature.
+
+    Per-point times, speeds and azimuths are listed in the properties
+    (null where unknown).
+    """
+
+    def optional(value: float) -> Optional[float]:
+        return None if math.isnan(value) else round(value, 1)
+
+    feature: Dict[str, Any] = {
+        "type": "Feature",
+        "geometry": {
+            "type": "LineString",
+            "coordinates": [[round(lon, 7), round(lat, 7)] for _, lat, lon, _, _ in points],
+        },
+        "properties": {
+            "name": name,
+            "times": [_iso_time(point[0]) for point in points],
+            "speeds": [optional(point[3]) for point in points],
+            "azimuths": [optional(point[4]) for point in points],
+        },
+    }
+    return json.dumps(feature)
@@ -0,0 +1,180 @@
+"""Streaming trip detection for Prizrak devices."""
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+EARTH_RADIUS = 6371008.8  # meters
+
+
+def _haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Return the great-circle distance between two fixes in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+class Trip:
+    """Running totals of one trip."""
+
+    __slots__ = (
+        "start_time", "last_active", "moving_time", "idle_time", "max_speed",
+        "gps_distance", "start_odometer", "end_odometer",
+        "start_lat", "start_lon", "end_lat", "end_lon",
+    )
+
+    def __init__(self, timestamp: float):
+        """Initialize a trip starting at timestamp (epoch seconds)."""
+        self.start_time = timestamp
+        self.last_active = timestamp
+        self.moving_time = 0.0
+        self.idle_time = 0.0
+        self.max_speed = 0.0
+        self.gps_distance = 0.0
+        self.start_odometer: Optional[float] = None
+        self.end_odometer: Optional[float] = None
+        self.start_lat: Optional[float] = None
+        self.start_lon: Optional[float] = None
+        self.end_lat: Optional[float] = None
+        self.end_lon: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        """Return seconds from start to the last ignition or movement."""
+        return self.last_active - self.start_time
+
+    @property
+    def distance(self) -> float:
+        """Return the distance in km: odometer if it moved, GPS otherwise."""
+        if (
+            self.start_odometer is not None
+            and self.end_odometer is not None
+            and self.end_odometer > self.start_odometer
+        ):
+            return self.end_odometer - self.start_odometer
+        return self.gps_distance / 1000
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the trip summary (times as ISO 8601, durations in minutes)."""
+        return {
+            "start_time": datetime.fromtimestamp(self.start_time, timezone.utc).isoformat(),
+            "end_time": datetime.fromtimestamp(self.last_active, timezone.utc).isoformat(),
+            "distance_km": round(self.distance, 2),
+            "duration_min": round(self.duration / 60, 1),
+            "moving_time_min": round(self.moving_time / 60, 1),
+            "idle_time_min": round(self.idle_time / 60, 1),
+            "max_speed": round(self.max_speed, 1),
+            "start_latitude": self.start_lat,
+            "start_longitude": self.start_lon,
+            "end_latitude": self.end_lat,
+            "end_longitude": self.end_lon,
+        }
+
+
+class TripDetector:
+    """Split one device's update stream into trips with O(1) work per update.
+
+    A trip opens on the first update with the ignition on or the car
+    moving, and closes once neither was seen for idle_timeout seconds
+    (on a later update, or via expire() when the stream goes quiet). The
+    time between two updates is credited to the state of the earlier one:
+    moving, idling (ignition on, standing) or parked (neither).
+    """
+
+    def __init__(self, idle_timeout: float = 300.0, moving_speed: float = 3.0):
+        """Initialize the detector.
+
+        Args:
+            idle_timeout: Seconds without ignition and movement that end a trip
+            moving_speed: Speed in km/h from which the car counts as moving
+        """
+        self.idle_timeout = idle_timeout
+        self.moving_speed = moving_speed
+        self.current: Optional[Trip] = None
+        self.last_trip: Optional[Trip] = None
+        self.trips_completed = 0
+
+        self._last_time: Optional[float] = None
+        self._last_moving = False
+        self._last_ignition = False
+        self._last_lat: Optional[float] = None
+        self._last_lon: Optional[float] = None
+
+    @property
+    def close_at(self) -> Optional[float]:
+        """Return when the open trip ends if nothing changes (None = not pending)."""
+        trip = self.current
+        if trip is None or self._last_moving or self._last_ignition:
+            return None
+        return trip.last_active + self.idle_timeout
+
+    def update(
+        self,
+        timestamp: float,
+        ignition: Optional[bool],
+        speed: Optional[float],
+        odometer: Optional[float] = None,
+        lat: Optional[float] = None,
+        lon: Optional[float] = None,
+    ) -> Optional[Trip]:
+        """Feed one device update and return the trip it ended, if any.
+
+        Args:
+            timestamp: Update time (epoch seconds)
+            ignition: True if the engine runs (None = unknown)
+            speed: Speed in km/h (None = unknown)
+            odometer: Odometer in km (None = unknown)
+            lat: Latitude of an actual GPS fix (None = no fix)
+            lon: Longitude of an actual GPS fix (None = no fix)
+        """
+        ended = self.expire(timestamp)
+        moving = speed is not None and speed >= self.moving_speed
+        active = bool(ignition) or moving
+
+        trip = self.current
+        if trip is None and active:
+            trip = self.current = Trip(timestamp)
+            trip.start_lat, trip.start_lon = lat, lon
+            self._last_time = timestamp
+
+        if trip is not None:
+            elapsed = max(0.0, timestamp - self._last_time)
+            if self._last_moving:
+                trip.moving_time += elapsed
+            elif self._last_ignition:
+                trip.idle_time += elapsed
+
+            if lat is not None and lon is not None:
+                # Only while driving, GPS jitter of a standing car is no distance
+                if (moving or self._last_moving) and self._last_lat is not None:
+                    trip.gps_distance += _haversine(self._last_lat, self._last_lon, lat, lon)
+                if active:
+                    trip.end_lat, trip.end_lon = lat, lon
+            if odometer is not None:
+                if trip.start_odometer is None:
+                    trip.start_odometer = odometer
+                trip.end_odometer = odometer
+            if speed is not None and speed > trip.max_speed:
+                trip.max_speed = speed
+            if active:
+                trip.last_active = timestamp
+
+        self._last_time = timestamp
+        self._last_moving = moving
+        self._last_ignition = bool(ignition)
+        if lat is not None and lon is not None:
+            self._last_lat, self._last_lon = lat, lon
+        return ended
+
+    def expire(self, now: float) -> Optional[Trip]:
+        """Close the open trip if it has been idle for idle_timeout."""
+        close_at = self.close_at
+        if close_at is None or now < close_at:
+            return None
+        trip = self.current
+        self.current = None
+        self.last_trip = trip
+        self.trips_completed += 1
+        return trip